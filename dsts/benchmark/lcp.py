@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------
+# Description: Compares the linear time (Kasai) LCP derivation against the
+#              previous pairwise suffix comparison on a sample document
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ---------------------------------------------------------------------------
+
+from time import time
+from dsts.misc import get_smp_file
+from dsts.suffix_array import SuffixArray
+
+
+def pairwise_lcp_array(sarray):
+    """ Derives the lcp array by slicing and comparing every pair of adjacent suffixes """
+    lcp_array = [-1, ]
+    for i in range(len(sarray.suffix_array) - 1):
+        string1 = sarray.str[sarray.get_pos(i):]
+        string2 = sarray.str[sarray.get_pos(i + 1):]
+        lcp_array.append(sarray.compare_strings(string1, string2))
+    return lcp_array
+
+
+if __name__ == "__main__":
+
+    tmp_str = get_smp_file('hamlet2.txt')
+    sarray = SuffixArray(tmp_str)
+
+    start = time()
+    sarray.derive_lcp_array()
+    kasai = time() - start
+
+    start = time()
+    expected = pairwise_lcp_array(sarray)
+    pairwise = time() - start
+
+    assert sarray.get_lcp_array() == expected
+    print "Text length: %s bytes" % len(tmp_str)
+    print "Kasai:    %.3fs" % kasai
+    print "Pairwise: %.3fs" % pairwise
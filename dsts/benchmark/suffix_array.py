@@ -1,19 +1,38 @@
 #!/usr/bin/env python
 
 # --------------------------------------------------------------------------
-# Description: Simple program thats creates a Reverse Suffix Array (RSA)
-#              from a document. Used to benchmark RSA construction
+# Description: Simple program thats creates a Suffix Array and a Reverse
+#              Suffix Array (RSA) from a document and finds its left super
+#              maximal repeats. Used to benchmark SA and RSA construction
+#              and repeat search
 # Author: Angelos Molfetas (2013)
 # Copyright: University of Melbourne (2013)
 # Licence: BSD Licence, see attached LICENCE file
 # ---------------------------------------------------------------------------
 
+from time import time
 from dsts.misc import get_smp_file
-from dsts.suffix_array import ReverseSuffixArray
+from dsts.suffix_array import SuffixArray, ReverseSuffixArray
 from dsts.search import super_maximal_repeats_left
 
 
 if __name__ == "__main__":
 
     tmp_str = get_smp_file('hamlet2.txt')
-    print super_maximal_repeats_left(tmp_str)
+
+    start = time()
+    sarray = SuffixArray(tmp_str)
+    build = time() - start
+
+    start = time()
+    ReverseSuffixArray(tmp_str)
+    reverse = time() - start
+
+    start = time()
+    repeats = list(super_maximal_repeats_left(sarray))
+    search = time() - start
+
+    print "Text length: %s bytes" % len(tmp_str)
+    print "Suffix array:    %.3fs" % build
+    print "Reverse suffix array: %.3fs" % reverse
+    print "Repeats (%s): %.3fs" % (len(repeats), search)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------
+# Description: Benchmark suite. Times suffix array construction, lcp
+#              derivation, search, lz77, LZ factorisation and Rabin & Karp
+#              hashing over the sample texts and synthetic worst cases.
+#              Every case runs in its own process so its peak memory can be
+#              measured. Results are written as JSON and compared against a
+#              stored baseline to catch regressions, e.g.
+#
+#                python -m dsts.benchmark.suite --output baseline.json
+#                python -m dsts.benchmark.suite --baseline baseline.json
+#
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ---------------------------------------------------------------------------
+
+import json
+import sys
+from argparse import ArgumentParser, SUPPRESS
+from os import listdir
+from platform import platform, python_version
+from random import Random
+from resource import getrusage, RUSAGE_SELF
+from subprocess import Popen, PIPE
+from time import time
+from dsts.misc import get_project_dir, get_smp_file, get_test_sample_dir
+
+SEED = 2013  # Seed of the synthetic inputs and search patterns, so runs are reproducible
+PATTERN_COUNT = 1000  # Number of patterns searched by the search cases
+PATTERN_LENGTH = 8
+WINDOW_SIZE = 4096  # lz77 window
+LARGE_WINDOW_SIZE = 1 << 20  # lz77 window of the bounded case, long chains over the runs inputs
+HASH_BLOCK = 16  # Rabin & Karp block size
+TOLERANCE = 0.1  # Relative slowdown or memory growth reported as a regression
+
+
+def synthetic_inputs(size):
+    """ Returns the synthetic worst cases as a {name: string} dictionary
+    size: length of each string
+    """
+    generator = Random(SEED)
+    block = ''.join(chr(generator.randrange(256)) for i in range(1024))
+    return {
+        'runs': 'a' * size,  # Longest lcps and lz77 matches
+        'dna': ''.join(generator.choice('ACGT') for i in range(size)),  # Small alphabet, short repeats
+        'repetitive': (block * (size // len(block) + 1))[:size],  # Long repeats over a random block
+    }
+
+
+def get_inputs(size):
+    """ Returns every benchmark input, the sample texts followed by the synthetic inputs """
+    inputs = dict((name, get_smp_file(name)) for name in listdir(get_test_sample_dir()))
+    inputs.update(synthetic_inputs(size))
+    return inputs
+
+
+def get_patterns(text):
+    """ Returns the patterns searched for in text, mostly substrings of it and some random strings """
+    generator = Random(SEED)
+    patterns = []
+    for i in range(PATTERN_COUNT):
+        if i % 4 == 3 or len(text) < PATTERN_LENGTH:
+            patterns.append(''.join(chr(generator.randrange(256)) for j in range(PATTERN_LENGTH)))
+        else:
+            start = generator.randrange(len(text) - PATTERN_LENGTH + 1)
+            patterns.append(text[start:start + PATTERN_LENGTH])
+    return patterns
+
+
+def _setup_suffix_array(text):
+    from dsts.suffix_array import SuffixArray
+    return SuffixArray(text), get_patterns(text)
+
+
+def _setup_encoded(text):
+    from dsts.compression import lz77
+    encoder = lz77()
+    encoder.encode(text, WINDOW_SIZE)
+    return encoder
+
+
+def _sort(text):
+    from dsts.sa import sort
+    sort(text)
+
+
+def _suffix_array(text):
+    from dsts.suffix_array import SuffixArray
+    SuffixArray(text)
+
+
+def _lcp(state):
+    state[0].derive_lcp_array()
+
+
+def _search(state):
+    sarray, patterns = state
+    for pattern in patterns:
+        sarray.search(pattern)
+
+
+def _search_all(state):
+    sarray, patterns = state
+    for pattern in patterns:
+        sarray.search_all(pattern)
+
+
+def _lz77_encode(text):
+    from dsts.compression import lz77
+    lz77().encode(text, WINDOW_SIZE)
+
+
+def _lz77_encode_bounded(text):
+    from dsts.compression import lz77, MAX_CHAIN, GOOD_ENOUGH
+    lz77().encode(text, LARGE_WINDOW_SIZE, max_chain=MAX_CHAIN, good_enough=GOOD_ENOUGH)
+
+
+def _lz77_decode(encoder):
+    encoder.decode()
+
+
+def _factorise(text):
+    from dsts.lz import factorise
+    factorise(text)
+
+
+def _rk_hash_all(text):
+    from dsts.hash import RK_hash_generator, SEARCH_RANGE
+    RK_hash_generator(HASH_BLOCK, SEARCH_RANGE).hash_all(text)
+
+
+# Case name: (setup, operation timed, unit). Setup turns the input text into the operation's argument, and
+# throughput is reported in bytes of text or in queries per second
+CASES = {
+    'sort': (None, _sort, 'bytes'),
+    'suffix_array': (None, _suffix_array, 'bytes'),
+    'lcp': (_setup_suffix_array, _lcp, 'bytes'),
+    'search': (_setup_suffix_array, _search, 'queries'),
+    'search_all': (_setup_suffix_array, _search_all, 'queries'),
+    'lz77_encode': (None, _lz77_encode, 'bytes'),
+    'lz77_encode_bounded': (None, _lz77_encode_bounded, 'bytes'),
+    'lz77_decode': (_setup_encoded, _lz77_decode, 'bytes'),
+    'factorise': (None, _factorise, 'bytes'),
+    'rk_hash_all': (None, _rk_hash_all, 'bytes'),
+}
+
+
+def run_case(case, name, size, repeat):
+    """ Runs a case on one input in this process, returns its result dictionary. The time is the best of
+    repeat runs, and the peak memory that of the whole process, so cases should run in separate processes
+    """
+    setup, operation, unit = CASES[case]
+    text = get_inputs(size)[name]
+    state = setup(text) if setup else text
+    setup_kb = getrusage(RUSAGE_SELF).ru_maxrss
+    best = None
+    for i in range(repeat):
+        start = time()
+        operation(state)
+        elapsed = time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    units = PATTERN_COUNT if unit == 'queries' else len(text)
+    return {'case': case, 'input': name, 'bytes': len(text), 'seconds': best, 'unit': unit,
+            'throughput': units / best if best > 0 else None, 'setup_kb': setup_kb,
+            'peak_kb': getrusage(RUSAGE_SELF).ru_maxrss}
+
+
+def run_suite(cases, size, repeat):
+    """ Runs every case on every input, each in a new interpreter, returns the result dictionaries """
+    results = []
+    for case in cases:
+        for name in sorted(get_inputs(size)):
+            process = Popen([sys.executable, '-m', 'dsts.benchmark.suite', '--run', case, name,
+                             '--size', str(size), '--repeat', str(repeat)], stdout=PIPE, cwd=get_project_dir())
+            output = process.communicate()[0]
+            if process.returncode != 0:
+                raise RuntimeError('Benchmark %s on %s failed' % (case, name))
+            results.append(json.loads(output))
+            result = results[-1]
+            sys.stderr.write('%-24s %-18s %10.4fs %10s kB\n' % (case, name, result['seconds'], result['peak_kb']))
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """ Compares results against baseline results, returns a list of regression descriptions. A case
+    regresses when its throughput drops or its peak memory grows by more than tolerance
+    """
+    previous = dict(((result['case'], result['input']), result) for result in baseline)
+    regressions = []
+    for result in results:
+        old = previous.get((result['case'], result['input']))
+        if old is None:
+            continue
+        if old['throughput'] and result['throughput'] and \
+                result['throughput'] < old['throughput'] * (1 - tolerance):
+            regressions.append('%s on %s: throughput %.1f %s/s, baseline %.1f' % (
+                result['case'], result['input'], result['throughput'], result['unit'], old['throughput']))
+        if result['peak_kb'] > old['peak_kb'] * (1 + tolerance):
+            regressions.append('%s on %s: peak memory %s kB, baseline %s kB' % (
+                result['case'], result['input'], result['peak_kb'], old['peak_kb']))
+    return regressions
+
+
+def main(argv=None):
+    parser = ArgumentParser(description='Benchmark suite of the dsts package')
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=sorted(CASES),
+                        help='cases to run, defaults to all of them')
+    parser.add_argument('--size', type=int, default=1 << 18, help='length of the synthetic inputs')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the fastest is reported')
+    parser.add_argument('--output', help='file the JSON results are written to, defaults to standard output')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='relative change allowed')
+    parser.add_argument('--run', nargs=2, help=SUPPRESS)  # Runs one case in this process, used by run_suite
+    args = parser.parse_args(argv)
+
+    if args.run:
+        print json.dumps(run_case(args.run[0], args.run[1], args.size, args.repeat))
+        return 0
+
+    report = {'python': python_version(), 'platform': platform(), 'size': args.size,
+              'results': run_suite(args.cases, args.size, args.repeat)}
+    if args.output:
+        f = open(args.output, 'w')
+        try:
+            json.dump(report, f, indent=2, sort_keys=True)
+        finally:
+            f.close()
+    else:
+        print json.dumps(report, indent=2, sort_keys=True)
+
+    if args.baseline:
+        f = open(args.baseline)
+        try:
+            baseline = json.load(f)
+        finally:
+            f.close()
+        regressions = compare(report['results'], baseline['results'], args.tolerance)
+        for regression in regressions:
+            sys.stderr.write('REGRESSION %s\n' % regression)
+        if regressions:
+            return 1
+        sys.stderr.write('No regressions against %s\n' % args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
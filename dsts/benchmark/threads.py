@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------
+# Description: Measures how building suffix arrays and LZ factorisations
+#              from a thread pool scales with the number of threads
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ---------------------------------------------------------------------------
+
+from multiprocessing import cpu_count
+from os import listdir
+from time import time
+from dsts.misc import get_smp_file, get_test_sample_dir
+from dsts.parallel import build_many, factorise_many
+
+COPIES = 8  # Number of times each sample is processed
+
+
+if __name__ == "__main__":
+
+    strings = [get_smp_file(name) for name in sorted(listdir(get_test_sample_dir()))] * COPIES
+    print "%s strings, %s bytes" % (len(strings), sum(len(string) for string in strings))
+
+    threads = 1
+    while threads <= cpu_count():
+        start = time()
+        factorise_many(strings, threads)
+        factorise_time = time() - start
+        start = time()
+        build_many(strings, threads, compact=True)
+        build_time = time() - start
+        print "%2s threads: factorise %.3fs, suffix arrays %.3fs" % (threads, factorise_time, build_time)
+        threads *= 2
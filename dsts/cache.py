@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------
+# Description: Cache of suffix arrays and LZ factorisations keyed by the
+#              sha1 of their input. Results are stored in a directory shared
+#              by every process, written to a temporary file and renamed in
+#              place so readers never see a partial result, and evicted
+#              least recently used first once the directory outgrows its
+#              size limit. An optional in-process cache keeps the most
+#              recently used results in memory
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ---------------------------------------------------------------------------
+
+import os
+from collections import OrderedDict
+from fcntl import flock, LOCK_EX, LOCK_UN
+from hashlib import sha1
+from struct import Struct
+from tempfile import mkstemp
+from time import time
+from dsts.lz_buffers import factorise_buffer
+from dsts.misc import as_bytes
+from dsts.storage import MappedArray, map_file, write_array
+from dsts.suffix_array import SuffixArray
+
+# Factor file: header, then the factor offsets and lengths as little endian 8 byte integers
+LZ_FILE_MAGIC = 'DSTSLZ'
+LZ_FILE_VERSION = 1
+LZ_FILE_HEADER = Struct('<6sHQ')  # magic, version, number of factors
+LZ_FILE_FORMAT = '<q'
+
+HASH_CHUNK = 1 << 20  # Bytes hashed at a time
+SUFFIXES = {'sa': '.sa', 'lz': '.lz'}  # Kind of result: file suffix
+LOCK_FILE = '.lock'
+
+
+def save_factors(path, offsets, lengths):
+    """ Saves factor arrays, see dsts.lz_buffers.factorise_buffer, to a file that can be loaded using
+    open_factors
+    """
+    f = open(path, 'wb')
+    try:
+        f.write(LZ_FILE_HEADER.pack(LZ_FILE_MAGIC, LZ_FILE_VERSION, len(offsets)))
+        write_array(f, offsets, LZ_FILE_FORMAT)
+        write_array(f, lengths, LZ_FILE_FORMAT)
+    finally:
+        f.close()
+
+
+def open_factors(path):
+    """ Loads factor arrays saved using save_factors from a memory map, returns (offsets, lengths) """
+    data = map_file(path)
+    if len(data) < LZ_FILE_HEADER.size:
+        raise ValueError('%s is not a factor file' % path)
+    magic, version, count = LZ_FILE_HEADER.unpack_from(data)
+    if magic != LZ_FILE_MAGIC or version != LZ_FILE_VERSION:
+        raise ValueError('%s is not a factor file' % path)
+    size = Struct(LZ_FILE_FORMAT).size
+    offsets = MappedArray(data, LZ_FILE_HEADER.size, count, LZ_FILE_FORMAT)
+    lengths = MappedArray(data, LZ_FILE_HEADER.size + count * size, count, LZ_FILE_FORMAT)
+    return offsets, lengths
+
+
+class BuildCache:
+    """ Cache of suffix arrays and LZ factorisations, see module description """
+    def __init__(self, directory, max_bytes=1 << 30, memory_items=0):
+        """ Constructor
+        directory: directory holding the cached results, created when missing. It can be shared by
+                   several processes
+        max_bytes: size of the directory above which the least recently used results are evicted
+        memory_items: number of results also kept in this process, none by default
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.memory = OrderedDict()  # Key: result, least recently used first
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:  # Created by another process in the meantime
+                if not os.path.isdir(directory):
+                    raise
+
+    def key(self, kind, data):
+        """ Returns the cache key of a result of the given kind built from data """
+        digest = sha1(kind)
+        for start in range(0, len(data), HASH_CHUNK):
+            digest.update(buffer(data, start, HASH_CHUNK))
+        return digest.hexdigest()
+
+    def path(self, kind, key):
+        """ Returns the path of a cached result """
+        return os.path.join(self.directory, key + SUFFIXES[kind])
+
+    def suffix_array(self, string):
+        """ Returns the SuffixArray of string, memory mapped from the cache when it was built before """
+        string = as_bytes(string)
+        key = self.key('sa', string)
+        return self._get('sa', key, SuffixArray.open, lambda: SuffixArray(string),
+                         lambda sarray, path: sarray.save(path))
+
+    def factorise(self, string):
+        """ Returns the LZ factors of string as (offsets, lengths) arrays, see
+        dsts.lz_buffers.factorise_buffer, memory mapped from the cache when they were built before. Use
+        dsts.lz_buffers.iter_factors for the tuples of dsts.lz.factorise, which cost a Python object per factor
+        """
+        string = as_bytes(string)
+        key = self.key('lz', string)
+        return self._get('lz', key, open_factors, lambda: factorise_buffer(string),
+                         lambda factors, path: save_factors(path, *factors))
+
+    def _get(self, kind, key, load, build, save):
+        """ Returns the result under key from memory, then disk, and otherwise builds and stores it
+        load: function loading a result from a path
+        build: function building the result
+        save: function saving a result to a path
+        """
+        memory_key = (kind, key)
+        if memory_key in self.memory:
+            self.hits += 1
+            result = self.memory.pop(memory_key)
+            self.memory[memory_key] = result
+            return result
+        path = self.path(kind, key)
+        try:
+            result = load(path)
+        except (IOError, OSError, ValueError):  # Missing, or not a result of this version
+            self.misses += 1
+            result = build()
+            self._store(path, result, save)
+        else:
+            self.hits += 1
+            try:
+                os.utime(path, None)  # Marks it recently used
+            except OSError:  # Evicted since it was opened, the open map stays readable
+                pass
+        self._remember(memory_key, result)
+        return result
+
+    def _store(self, path, result, save):
+        """ Saves a result under a temporary name then renames it, so other processes only see complete
+        results, and evicts results over the size limit
+        """
+        handle, temporary = mkstemp(dir=self.directory, prefix='.tmp')
+        os.close(handle)
+        try:
+            save(result, temporary)
+            os.rename(temporary, path)  # Atomic, a concurrent build of the same input writes the same result
+        except Exception:
+            os.remove(temporary)
+            raise
+        self.evict()
+
+    def _remember(self, memory_key, result):
+        """ Keeps a result in memory, dropping the least recently used one when full """
+        if self.memory_items <= 0:
+            return
+        self.memory[memory_key] = result
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def entries(self):
+        """ Returns the cached results on disk as (last use, size, path) tuples, least recently used first """
+        entries = []
+        for name in os.listdir(self.directory):
+            if os.path.splitext(name)[1] not in SUFFIXES.values() or name.startswith('.'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                status = os.stat(path)
+            except OSError:  # Evicted by another process
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self, max_bytes=None):
+        """ Removes the least recently used results until the cache fits in max_bytes, defaults to the
+        cache's limit. Eviction is serialised across processes with a lock file. Processes that have a
+        result open keep reading it after it is removed
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        lock = open(os.path.join(self.directory, LOCK_FILE), 'a')
+        try:
+            flock(lock.fileno(), LOCK_EX)
+            entries = self.entries()
+            total = sum(size for last_use, size, path in entries)
+            for last_use, size, path in entries:
+                if total <= max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+            self._remove_stale()
+            flock(lock.fileno(), LOCK_UN)
+        finally:
+            lock.close()
+
+    def _remove_stale(self, age=3600):
+        """ Removes temporary files left behind by processes that died while storing a result """
+        for name in os.listdir(self.directory):
+            if name.startswith('.tmp'):
+                path = os.path.join(self.directory, name)
+                try:
+                    if os.stat(path).st_mtime < time() - age:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        """ Removes every cached result, on disk and in memory """
+        self.memory.clear()
+        self.evict(0)
@@ -9,32 +9,236 @@
 # -----------------------------------------------------------------
 
 
+from array import array
+from struct import Struct
+from time import time
+from zlib import crc32
+from dsts.instrument import active
+from dsts.misc import as_bytes
+
+MIN_CHAIN_MATCH = 3  # Length of the prefixes indexed by the hash chains
+MAX_CHAIN = 128  # Suggested max_chain for encode, as zlib's default level
+GOOD_ENOUGH = 128  # Suggested good_enough for encode, as zlib's nice_length
+
+# Container: magic, version, then varint window size and input length, and the crc32 of the input. Followed by
+# records starting with a varint tag: odd tags are tag >> 1 literal characters, even tags a reference of
+# distance tag >> 1 followed by a varint length and the character after it
+LZ77_MAGIC = 'DLZ77'
+LZ77_VERSION = 1
+LZ77_CRC = Struct('<I')
+
+
+def write_varint(out, value):
+    """ Appends an unsigned integer to bytearray out, 7 bits per byte, least significant first """
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """ Reads an unsigned integer written by write_varint from bytearray data, returns (value, next pos) """
+    value = 0
+    shift = 0
+    while True:
+        try:
+            byte = data[pos]
+        except IndexError:
+            raise ValueError('Truncated lz77 container')
+        value |= (byte & 0x7f) << shift
+        pos += 1
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
 class lz77:
     """ LZ77 encoder, based on Ziv and Lempel (1977) compression algorithm """
 
-    def encode(self, var, window_size):
+    def encode(self, var, window_size, dictionary='', max_chain=None, good_enough=None):
+        """ Encodes a string into (distance, length, character) instructions. Matches are found using hash
+        chains linking every window position to the previous one starting with the same MIN_CHAIN_MATCH
+        characters, shorter matches use the last position of each one and two character prefix.
+        var: string or bytes like object to encode, e.g. a bytearray or mmap, unicode strings are encoded as utf8
+        window_size: how far back matches are searched for
+        dictionary: string preceding var that matches may refer to, decode needs the same dictionary
+        max_chain: most chain positions compared per instruction, e.g. MAX_CHAIN. Long chains, e.g. in runs
+                   of one character, otherwise cost O(window_size) per instruction. By default the whole chain
+                   is walked and the instructions are those of a scan of the whole window. A limit, like
+                   good_enough, trades longer matches for speed, so the instructions differ
+        good_enough: match length at which the chain walk stops looking for a longer one, e.g. GOOD_ENOUGH
+        """
+        var = as_bytes(var)
+        dictionary = as_bytes(dictionary)
         self.instructions = []
+        self.window_size = window_size
+        self.checksum = crc32(var) & 0xffffffff
+        self.length = len(var)
+
+        if dictionary:
+            var = dictionary[:] + var[:]
+        length = len(var)
+        heads = {}  # prefix: last position starting with it
+        chain = array('l', [-1]) * length  # position: previous position starting with the same prefix
+        last_pair = {}  # two character prefix: last position
+        last_char = {}  # character: last position
+        inserted = 0    # Positions before this one are in the chains
+        if max_chain is None:
+            max_chain = length  # No chain is longer
+        if good_enough is None:
+            good_enough = length  # No match is longer
+        coding_pos = len(dictionary)
+        metrics = active()  # Instrumentation, see dsts.instrument
+        probes = 0  # Window positions compared against the coding position
+        insert_time = search_time = 0.0
+        while (coding_pos < length):  # Until end of the string is reached
+            if metrics:
+                started = time()
+            while inserted < coding_pos:  # Add positions passed by the last instruction to the chains
+                if inserted + MIN_CHAIN_MATCH <= length:
+                    prefix = var[inserted:inserted + MIN_CHAIN_MATCH]
+                    chain[inserted] = heads.get(prefix, -1)
+                    heads[prefix] = inserted
+                if inserted + 2 <= length:
+                    last_pair[var[inserted:inserted + 2]] = inserted
+                last_char[var[inserted]] = inserted
+                inserted += 1
+            if metrics:
+                searched = time()
+                insert_time += searched - started
 
-        coding_pos = 0
-        while (coding_pos < len(var)):  # Until end of the string is reached
+            window_start = max(coding_pos - window_size, 0)
+            limit = length - coding_pos - 1  # Leave a character to follow the match
             longest_pos = None
             longest_size = 0
-            ptr = coding_pos - window_size  # Pointer to search through the window
-            while (ptr < coding_pos):      # Move pointer up to the coding pos
-                #print "ptr", ptr
-                if ptr >= 0:                # If position is empty, out of window, only increment
-                    if var[coding_pos] == var[ptr]:  # We found a match
-                        current_longest = self._find_longest(var, ptr, coding_pos, coding_pos, len(var))
-                        if longest_size <= current_longest:
-                            longest_size = current_longest
-                            longest_pos = ptr
-                ptr += 1
+            if limit >= MIN_CHAIN_MATCH - 1:  # Nearest positions first, so ties keep the nearest match
+                ptr = heads.get(var[coding_pos:coding_pos + MIN_CHAIN_MATCH], -1)
+                chain_left = max_chain
+                while ptr >= window_start and longest_size < limit and longest_size < good_enough and chain_left:
+                    chain_left -= 1
+                    probes += 1
+                    current_longest = min(self._find_longest(var, ptr, coding_pos, coding_pos, length), limit)
+                    if longest_size < current_longest:
+                        longest_size = current_longest
+                        longest_pos = ptr
+                    ptr = chain[ptr]
+            for ptr in (last_pair.get(var[coding_pos:coding_pos + 2], -1), last_char.get(var[coding_pos], -1)):
+                if ptr >= window_start and limit > 0:
+                    probes += 1
+                    current_longest = min(self._find_longest(var, ptr, coding_pos, coding_pos, length), limit)
+                    if longest_size < current_longest or (longest_size == current_longest and longest_pos < ptr):
+                        longest_size = current_longest
+                        longest_pos = ptr
+            if metrics:
+                search_time += time() - searched
+
             if longest_pos is None:
                 self.instructions.append((0, 0, var[coding_pos]))
             else:
                 self.instructions.append((coding_pos - longest_pos, longest_size, var[coding_pos + longest_size]))
             coding_pos += (longest_size + 1)  # Move coding pos forward
 
+        if metrics:
+            matches = [item[1] for item in self.instructions if item[1]]
+            metrics.add_time('lz77.encode.chains', insert_time)
+            metrics.add_time('lz77.encode.search', search_time)
+            metrics.add('lz77.encode.bytes', self.length)
+            metrics.add('lz77.encode.probes', probes)
+            metrics.add('lz77.encode.matches', len(matches))
+            metrics.add('lz77.encode.bytes_matched', sum(matches))
+            metrics.peak('lz77.encode.chain_heads', len(heads))
+
+    def to_bytes(self):
+        """ Returns the instructions packed into a binary container, see LZ77_MAGIC """
+        if getattr(self, 'checksum', None) is None:  # Instructions not produced by encode
+            decoded = self.decode()
+            self.checksum, self.length = crc32(decoded) & 0xffffffff, len(decoded)
+        out = bytearray(LZ77_MAGIC)
+        out.append(LZ77_VERSION)
+        window_size = getattr(self, 'window_size', None)
+        if window_size is None:  # Instructions not produced by encode, the window is the furthest reference
+            window_size = max([item[0] for item in self.instructions] + [0])
+        write_varint(out, window_size)
+        write_varint(out, self.length)
+        out += LZ77_CRC.pack(self.checksum)
+        literals = bytearray()  # Run of literal instructions not written yet
+        for distance, length, char in self.instructions:
+            if distance == 0:
+                literals += char
+                continue
+            if literals:
+                write_varint(out, len(literals) << 1 | 1)
+                out += literals
+                literals = bytearray()
+            write_varint(out, distance << 1)
+            write_varint(out, length)
+            out += char
+        if literals:
+            write_varint(out, len(literals) << 1 | 1)
+            out += literals
+        return str(out)
+
+    @classmethod
+    def from_bytes(cls, data, dictionary=''):
+        """ Returns an lz77 object holding the instructions of a container produced by to_bytes. Raises
+        ValueError on a reference before the start of the output, so corrupt input cannot reach decode
+        dictionary: dictionary the string was encoded with, references may extend into it
+        """
+        data = bytearray(data)
+        if data[:len(LZ77_MAGIC)] != LZ77_MAGIC:
+            raise ValueError('Not an lz77 container')
+        if len(data) == len(LZ77_MAGIC):
+            raise ValueError('Truncated lz77 container')
+        if data[len(LZ77_MAGIC)] != LZ77_VERSION:
+            raise ValueError('Unsupported lz77 container version %s' % data[len(LZ77_MAGIC)])
+        decoder = cls()
+        decoder.window_size, pos = read_varint(data, len(LZ77_MAGIC) + 1)
+        if decoder.window_size == 0:  # No references, or written without a window, see decode_stream
+            decoder.window_size = None
+        decoder.length, pos = read_varint(data, pos)
+        if pos + LZ77_CRC.size > len(data):
+            raise ValueError('Truncated lz77 container')
+        decoder.checksum = LZ77_CRC.unpack_from(buffer(data), pos)[0]
+        pos += LZ77_CRC.size
+        decoder.instructions = instructions = []
+        decoded = len(dictionary)  # Characters available to references
+        while pos < len(data):
+            tag, pos = read_varint(data, pos)
+            if tag & 1:  # Literal run
+                end = pos + (tag >> 1)
+                if end > len(data):
+                    raise ValueError('Truncated lz77 container')
+                instructions.extend((0, 0, chr(byte)) for byte in data[pos:end])
+                decoded += end - pos
+                pos = end
+            else:
+                length, pos = read_varint(data, pos)
+                if pos >= len(data):
+                    raise ValueError('Truncated lz77 container')
+                if not 0 < tag >> 1 <= decoded:
+                    raise ValueError('Invalid lz77 reference, distance %s at position %s' % (tag >> 1, decoded))
+                instructions.append((tag >> 1, length, chr(data[pos])))
+                decoded += length + 1
+                pos += 1
+        return decoder
+
+    def save(self, path):
+        """ Writes the instructions to a file as a binary container """
+        f = open(path, 'wb')
+        try:
+            f.write(self.to_bytes())
+        finally:
+            f.close()
+
+    @classmethod
+    def open(cls, path, dictionary=''):
+        """ Returns an lz77 object holding the instructions saved to a file using save, see from_bytes """
+        f = open(path, 'rb')
+        try:
+            return cls.from_bytes(f.read(), dictionary)
+        finally:
+            f.close()
+
     def print_instructions(self):
         """ Prints instructions """
         for item in self.instructions:
@@ -54,17 +258,78 @@ class lz77:
                 break
         return size
 
-    def decode(self):
-        """ Decodes compressed instruction into original string """
-        new_str = ""
-        pos = 0
-        for item in self.instructions:
-            if item[0] == 0:
-                new_str += item[2]
-                pos += 1
-            else:
-                travel_back = pos - item[0]
-                new_str += new_str[travel_back:travel_back + item[1]]
-                new_str += item[2]
-                pos += item[1] + 1
-        return new_str
+    def decode(self, dictionary=''):
+        """ Decodes compressed instruction into original string
+        dictionary: dictionary the string was encoded with
+        """
+        metrics = active()
+        if metrics:
+            started = time()
+        buf = bytearray(dictionary) + bytearray(sum(item[1] + 1 for item in self.instructions))  # Preallocate
+        pos = len(dictionary)
+        for distance, length, char in self.instructions:
+            if length and not 0 < distance <= pos:
+                raise ValueError('Invalid lz77 reference, distance %s at position %s' % (distance, pos))
+            src = pos - distance
+            while length > 0:  # References longer than their distance repeat the copied characters
+                step = min(length, distance)
+                buf[pos:pos + step] = buf[src:src + step]
+                pos += step
+                src += step
+                length -= step
+            buf[pos] = char
+            pos += 1
+        decoded = str(buf[len(dictionary):])
+        self._verify(crc32(decoded) & 0xffffffff, len(decoded))
+        if metrics:
+            metrics.add_time('lz77.decode', time() - started)
+            metrics.add('lz77.decode.bytes_copied', len(decoded) - len(self.instructions))
+            metrics.peak('lz77.decode.buffer', len(buf))
+        return decoded
+
+    def decode_stream(self, chunk_size=65536, dictionary=''):
+        """ Generator decoding compressed instructions into chunks of the original string, only keeping a
+        window of previous output in memory
+        chunk_size: least number of characters per chunk, except for the last one
+        dictionary: dictionary the string was encoded with
+        """
+        window_size = getattr(self, 'window_size', None)
+        if window_size is None:  # Instructions not produced by encode, the window is the furthest reference
+            window_size = max([item[0] for item in self.instructions] + [0])
+        buf = bytearray(dictionary)
+        skip = len(dictionary)  # Characters at the start of buf that are not output
+        checksum = 0
+        total = 0
+        for distance, length, char in self.instructions:
+            if length and not 0 < distance <= len(buf):  # Also rejects references beyond the window kept
+                raise ValueError('Invalid lz77 reference, distance %s at position %s' %
+                                 (distance, total + len(buf) - skip))
+            src = len(buf) - distance
+            while length > 0:
+                step = min(length, distance)
+                buf += buf[src:src + step]
+                src += step
+                length -= step
+            buf += char
+            if len(buf) >= skip + window_size + chunk_size:  # Emit everything before the window
+                end = len(buf) - window_size
+                chunk = str(buf[skip:end])
+                checksum = crc32(chunk, checksum)
+                total += len(chunk)
+                del buf[:end]
+                skip = 0
+                yield chunk
+        chunk = str(buf[skip:])
+        self._verify(crc32(chunk, checksum) & 0xffffffff, total + len(chunk))
+        if chunk:
+            yield chunk
+
+    def decode_to(self, f, chunk_size=65536, dictionary=''):
+        """ Decodes compressed instructions into file object f, see decode_stream """
+        for chunk in self.decode_stream(chunk_size, dictionary):
+            f.write(chunk)
+
+    def _verify(self, checksum, length):
+        """ Raises ValueError when decoded output does not match the checksum and length of the input """
+        if getattr(self, 'checksum', None) is not None and (checksum != self.checksum or length != self.length):
+            raise ValueError('Decoded output does not match the lz77 checksum')
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------
+# Description: FM-index, a compressed full text index made of the Burrows
+#              Wheeler transform of a string, occurrence counts sampled
+#              along it and a sampled suffix array. Counts substrings in
+#              O(m) and locates them without keeping the string, suffix
+#              array or lcp array (Ferragina & Manzini, 2000)
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ---------------------------------------------------------------------------
+
+from array import array
+from bisect import bisect_left
+from struct import Struct
+from dsts.misc import as_bytes
+from dsts.sa import sort
+from dsts.storage import MappedArray, index_typecode, map_file, write_array
+
+# FM-index file: header, alphabet, transform, then as little endian integers of the header's width the
+# character totals, the checkpoints of each alphabet character, the marked rows and their text positions
+FM_FILE_MAGIC = 'DSTSFM'
+FM_FILE_VERSION = 1
+FM_FILE_HEADER = Struct('<6sHHQQII')  # magic, version, width, length, primary row, sample rate, checkpoint
+FM_FILE_FORMATS = {4: '<I', 8: '<Q'}
+
+SAMPLE_RATE = 32  # Text positions between suffix array samples
+CHECKPOINT = 256  # Rows between occurrence count checkpoints
+PLACEHOLDER = '\x00'  # Stands in for the end of string marker in the transform, see FMIndex.occ
+
+
+class FMIndex:
+    """ FM-index of a string. The transform has a row for every suffix plus one for the empty suffix,
+    which sorts first. Its character at row i precedes the suffix at row i in the string, and the row of
+    the whole string, which has no preceding character, is the primary row
+    """
+    def __init__(self, string, suffix_array=None, sample_rate=SAMPLE_RATE, checkpoint=CHECKPOINT):
+        """ Constructor, sorts the string and builds the index. The string is not kept
+        string: string or bytes like object to index, see SuffixArray
+        suffix_array: previously built suffix array of string, e.g. from dsts.sa.sort, skips sorting
+        sample_rate: distance between sampled text positions. locate walks at most sample_rate - 1 rows
+                     per instance, while the samples take two integers per sample_rate characters
+        checkpoint: distance between occurrence count checkpoints. Counting scans at most checkpoint
+                    characters per pattern character, while the checkpoints take an integer per
+                    checkpoint rows for each distinct character
+        """
+        if sample_rate < 1 or checkpoint < 1:
+            raise ValueError('Sample rate and checkpoint distance should be positive')
+        string = as_bytes(string)
+        length = len(string)
+        if suffix_array is None:
+            suffix_array = sort(string, array(index_typecode(length), [0]) * length) if length else ()
+        self.length = length
+        self.sample_rate = sample_rate
+        self.checkpoint = checkpoint
+
+        transform = bytearray(length + 1)
+        transform[0] = ord(string[length - 1]) if length else ord(PLACEHOLDER)
+        marked = array(index_typecode(length + 1))
+        samples = array(index_typecode(length))
+        self.primary = 0
+        for i in range(length):
+            pos = suffix_array[i]
+            if pos == 0:
+                self.primary = i + 1
+                transform[i + 1] = ord(PLACEHOLDER)
+            else:
+                transform[i + 1] = ord(string[pos - 1])
+            if pos % sample_rate == 0:
+                marked.append(i + 1)
+                samples.append(pos)
+        self.bwt = str(transform)
+        self.marked = marked
+        self.samples = samples
+
+        self.checkpoints = {}  # Character: occurrences before every checkpoint row
+        totals = {}
+        for char in set(self.bwt):
+            counts = array(index_typecode(length + 1))
+            total = 0
+            for start in range(0, length + 2, checkpoint):  # Up to and including row length + 1
+                counts.append(total)
+                total += self.bwt.count(char, start, start + checkpoint)
+            if char == PLACEHOLDER:  # Discount the primary row from the checkpoints after it
+                for block in range(self.primary / checkpoint + 1, len(counts)):
+                    counts[block] -= 1
+                total -= 1
+            if total:
+                self.checkpoints[char] = counts
+                totals[char] = total
+        self._set_totals(totals)
+
+    def _set_totals(self, totals):
+        """ Derives C, the row of the first suffix starting with each character, from their totals """
+        self.totals = totals
+        self.first_row = {}
+        row = 1  # After the empty suffix
+        for char in sorted(totals):
+            self.first_row[char] = row
+            row += totals[char]
+
+    def __len__(self):
+        return self.length
+
+    def save(self, path):
+        """ Saves the index to a file that can be loaded using open """
+        width = 4 if self.length + 1 < 2 ** 32 else 8
+        fmt = FM_FILE_FORMATS[width]
+        alphabet = ''.join(sorted(self.totals))
+        f = open(path, 'wb')
+        try:
+            f.write(FM_FILE_HEADER.pack(FM_FILE_MAGIC, FM_FILE_VERSION, width, self.length, self.primary,
+                                        self.sample_rate, self.checkpoint))
+            f.write(chr(len(alphabet) - 1) if alphabet else '')
+            f.write(alphabet)
+            f.write(self.bwt)
+            write_array(f, [self.totals[char] for char in alphabet], fmt)
+            for char in alphabet:
+                write_array(f, self.checkpoints[char], fmt)
+            write_array(f, self.marked, fmt)
+            write_array(f, self.samples, fmt)
+        finally:
+            f.close()
+
+    @classmethod
+    def open(cls, path):
+        """ Loads an index saved using save. The file is memory mapped and read in place """
+        data = map_file(path)
+        if len(data) < FM_FILE_HEADER.size:
+            raise ValueError('%s is not an FM-index file' % path)
+        magic, version, width, length, primary, sample_rate, checkpoint = FM_FILE_HEADER.unpack_from(data)
+        if magic != FM_FILE_MAGIC:
+            raise ValueError('%s is not an FM-index file' % path)
+        if version != FM_FILE_VERSION or width not in FM_FILE_FORMATS:
+            raise ValueError('Unsupported FM-index file version %s, width %s' % (version, width))
+        fmt = FM_FILE_FORMATS[width]
+        offset = FM_FILE_HEADER.size
+        alphabet = ''
+        if length:
+            size = ord(data[offset]) + 1
+            alphabet = data[offset + 1:offset + 1 + size]
+            offset += 1 + size
+
+        index = cls('', sample_rate=sample_rate, checkpoint=checkpoint)
+        index.length = length
+        index.primary = primary
+        index.bwt = buffer(data, offset, length + 1)
+        offset += length + 1
+        totals = MappedArray(data, offset, len(alphabet), fmt)
+        offset += len(alphabet) * width
+        blocks = (length + 1) / checkpoint + 1
+        index.checkpoints = {}
+        for char in alphabet:
+            index.checkpoints[char] = MappedArray(data, offset, blocks, fmt)
+            offset += blocks * width
+        samples = (length - 1) / sample_rate + 1 if length else 0
+        index.marked = MappedArray(data, offset, samples, fmt)
+        index.samples = MappedArray(data, offset + samples * width, samples, fmt)
+        index._set_totals(dict(zip(alphabet, totals)))
+        index.mapped_file = data
+        return index
+
+    def occ(self, char, row):
+        """ Returns the number of times char occurs in the transform before row """
+        counts = self.checkpoints.get(char)
+        if counts is None:
+            return 0
+        block = row / self.checkpoint
+        start = block * self.checkpoint
+        count = counts[block] + self.bwt[start:row].count(char)
+        if char == PLACEHOLDER and start <= self.primary < row:
+            count -= 1
+        return count
+
+    def lf(self, row):
+        """ Returns the row of the suffix one character longer than the suffix at row (last to first
+        mapping). The primary row, the whole string, has none
+        """
+        char = self.bwt[row]
+        return self.first_row[char] + self.occ(char, row)
+
+    def search_range(self, target):
+        """ Searches the index by backward search in O(m), returns the interval (lo, hi) of rows prefixed
+        by target, lo == hi when it is not found
+        """
+        target = as_bytes(target)[:]
+        if not target:
+            return 1, self.length + 1  # Every suffix but the empty one
+        lo, hi = 0, self.length + 1
+        for char in reversed(target):
+            first = self.first_row.get(char)
+            if first is None:
+                return 0, 0
+            lo = first + self.occ(char, lo)
+            hi = first + self.occ(char, hi)
+            if lo >= hi:
+                return 0, 0
+        return lo, hi
+
+    def count(self, target):
+        """ Returns the number of instances of a substring """
+        lo, hi = self.search_range(target)
+        return hi - lo
+
+    def get_pos(self, row):
+        """ Returns the position in the string of the suffix at row, walking back to a sampled position """
+        steps = 0
+        while True:
+            i = bisect_left(self.marked, row)
+            if i < len(self.marked) and self.marked[i] == row:
+                return self.samples[i] + steps
+            row = self.lf(row)
+            steps += 1
+
+    def locate(self, target):
+        """ Searches for all instances of a substring, returns their positions in increasing order """
+        lo, hi = self.search_range(target)
+        return sorted(self.get_pos(row) for row in range(lo, hi))
+
+    def search(self, target):
+        """ Searches for a substring, returns the position of an instance or -1 when not found """
+        lo, hi = self.search_range(target)
+        if lo == hi:
+            return -1
+        return self.get_pos(lo)
@@ -1,14 +1,47 @@
 #!/usr/bin/env python
 
 #------------------------------------------------------------------
-# Description: Rabin & Karp fingerprint generator class
+# Description: Rabin & Karp fingerprint generator class, multi pattern
+#              search and content defined chunker
 # Author: Angelos Molfetas (2013)
 # Copyright: The University of Melbourne (2013)
 # Licence: BSD licence, see attached LICENCE file
 # -----------------------------------------------------------------
 
 #from Queue import Queue
+from array import array
+from bisect import bisect_left
 from collections import deque as Queue
+from hashlib import sha1
+from random import Random
+from dsts.misc import as_bytes
+try:
+    from dsts import rk
+except ImportError:  # Extension not built, hash_all falls back to Python
+    rk = None
+
+CHUNK_SIZE = 1 << 20  # Bytes read from the buffer at a time by hash_all
+RK_MAX_RANGE = 1 << 31  # Largest hash range of the rk extension, larger ones are hashed in Python
+GEAR_SEED = 0x44535453  # Seed of the gear table, changing it moves every chunk boundary
+GEAR_BITS = 32  # Width of the gear hash, each byte influences the hash for this many bytes
+NORMALISATION = 2  # Extra mask bits before the average chunk size, fewer after it
+SEARCH_RANGE = 2147483647  # Hash range of the multi pattern search, prime
+
+
+def read_buffers(source, read_size=CHUNK_SIZE):
+    """ Generator of the byte sequences of a stream
+    source: file object, read read_size bytes at a time, byte sequence or iterable of byte sequences
+    """
+    if hasattr(source, 'read'):
+        data = source.read(read_size)
+        while data:
+            yield data
+            data = source.read(read_size)
+    elif isinstance(source, (str, bytearray, buffer, memoryview)):
+        yield source
+    else:
+        for data in source:
+            yield data
 
 
 class RK_hash_generator:
@@ -29,17 +62,19 @@ class RK_hash_generator:
 
     def incremental(self, next_char):
         """ Calculates hash of byte sequence and stores it in the hash table. Use 'hash_block_with_history' method first to
-        instantiate generator history before using this method. """
+        instantiate generator history before using this method.
+        next_char: next character, or its byte value """
         try:
             previous_char = self.chars.popleft()
         except AttributeError:  # Self.chars not defined, no history defined
             raise RuntimeWarning('No history defined, hash_block_with_history should be called first')
         try:
-            self.prev_hash = ((self.prev_hash - ord(previous_char) * pow(self.base, self.block_size - 1)) * self.base + ord(next_char))
+            next_byte = next_char if isinstance(next_char, int) else ord(next_char)
         except TypeError:
             raise TypeError('Incremental buffer should be of size one')
-        self.chars.append(next_char)
-        return self.prev_hash % self.hash_range
+        self.prev_hash = ((self.prev_hash - previous_char * self.high_power) * self.base + next_byte) % self.hash_range
+        self.chars.append(next_byte)
+        return self.prev_hash
 
     def hash_block(self, byte_sequence):
         """ Calculates hash of byte sequence """
@@ -51,17 +86,190 @@ class RK_hash_generator:
         """ Calculate hash of byte sequence """
         if len(byte_sequence) != self.block_size:  # length of byte sequence must match specified block size
             raise BufferError('Byte sequence is %s long instead of %s' % (len(byte_sequence), self.block_size))
-        self.prev_hash = self._hash_block_unconstrained(byte_sequence)
-        self.chars = Queue()  # Queue is used to store history
-        for char in byte_sequence:
-            self.chars.append(char)
-        return self.prev_hash % self.hash_range
+        self.prev_hash = self._hash_block_unconstrained(byte_sequence) % self.hash_range
+        self.high_power = pow(self.base, self.block_size - 1, self.hash_range)  # Weight of the outgoing character
+        self.chars = Queue(bytearray(as_bytes(byte_sequence)))  # Queue is used to store history, as byte values
+        return self.prev_hash
+
+    def hash_all(self, byte_sequence):
+        """ Calculates the hash of every block sized window of a byte sequence, e.g. a string, bytearray,
+        buffer or mmap. Returns an array of len(byte_sequence) - block_size + 1 hashes, the hash at i
+        being hash_block(byte_sequence[i:i + block_size]). Hashing runs in the rk extension when it is built
+        and the hash range is at most RK_MAX_RANGE, otherwise in Python at a few MB/s
+        """
+        size = self.block_size
+        base = self.base
+        hash_range = self.hash_range
+        if rk is not None and 0 < hash_range <= RK_MAX_RANGE and size > 0:
+            byte_sequence = as_bytes(byte_sequence)
+            hashes = array('l', [0]) * max(len(byte_sequence) - size + 1, 0)
+            return rk.hash_all(byte_sequence, size, base, hash_range, hashes)
+        high_power = pow(base, size - 1, hash_range)
+        hashes = array('l')
+        length = len(byte_sequence)
+        if length < size:
+            return hashes
+        append = hashes.append
+        h = 0
+        for byte in bytearray(byte_sequence[0:size]):
+            h = (h * base + byte) % hash_range
+        append(h)
+        for start in range(size, length, CHUNK_SIZE):
+            # Read the chunk with the block before it, so the outgoing characters are at i - size
+            data = bytearray(byte_sequence[start - size:start + CHUNK_SIZE])
+            for i in range(size, len(data)):
+                h = ((h - data[i - size] * high_power) * base + data[i]) % hash_range
+                append(h)
+        return hashes
 
     def _hash_block_unconstrained(self, byte_sequence):
         """ Calculates hash of byte sequence without modulo"""
         h = 0      # initial hash value, starts at zero
         multiplier = self.block_size - 1
-        for byte in byte_sequence:
-            h += (ord(byte) * pow(self.base, multiplier))
+        for byte in bytearray(as_bytes(byte_sequence)):
+            h += (byte * pow(self.base, multiplier))
             multiplier -= 1
         return h
+
+
+class RK_pattern_search:
+    """ Multi pattern Rabin & Karp search. Patterns are indexed by hash in one table per pattern length, so
+    a stream is searched for all of them in a single pass """
+    def __init__(self, hash_range=SEARCH_RANGE):
+        """ Constructor
+        hash_range: addressable size of the hashing space, should be a prime number
+        """
+        self.hash_range = hash_range
+        self.patterns = {}  # Pattern id: pattern
+        self.generators = {}  # Pattern length: RK_hash_generator
+        self.tables = {}  # Pattern length: {hash: [pattern ids]}
+
+    def add(self, pattern, pattern_id=None):
+        """ Registers a pattern, returns its id
+        pattern_id: id reported with its matches, defaults to the number of patterns registered before it
+        """
+        pattern = as_bytes(pattern)[:]
+        if not pattern:
+            raise ValueError('Pattern should not be empty')
+        if pattern_id is None:
+            pattern_id = len(self.patterns)
+        if pattern_id in self.patterns:
+            raise KeyError('Pattern id %s already registered' % pattern_id)
+        length = len(pattern)
+        if length not in self.generators:
+            self.generators[length] = RK_hash_generator(length, self.hash_range)
+            self.tables[length] = {}
+        h = self.generators[length].hash_block(pattern)
+        self.tables[length].setdefault(h, []).append(pattern_id)
+        self.patterns[pattern_id] = pattern
+        return pattern_id
+
+    def search(self, source, read_size=CHUNK_SIZE):
+        """ Generator of the matches of all patterns in a stream, yields (offset, pattern id) tuples ordered
+        by offset. Matches are verified against the stream, so hash collisions are not reported
+        source: file object, byte sequence or iterable of byte sequences, see read_buffers
+        """
+        if not self.patterns:
+            return
+        longest = max(self.tables)
+        patterns = self.patterns
+        tail = ''  # End of the previous buffer, windows overlapping it are completed by the next one
+        offset = 0  # Stream offset of tail[0]
+        matches = []  # Matches that a longer pattern in the next buffer may precede
+        for data in read_buffers(source, read_size):
+            data = tail + as_bytes(data)[:]
+            for length, table in self.tables.iteritems():
+                first = max(len(tail) - length + 1, 0)  # Windows within tail were searched already
+                hashes = self.generators[length].hash_all(data)
+                for i in range(first, len(hashes)):
+                    ids = table.get(hashes[i])
+                    if ids is not None:
+                        window = data[i:i + length]
+                        for pattern_id in ids:
+                            if patterns[pattern_id] == window:
+                                matches.append((offset + i, pattern_id))
+            matches.sort()
+            done = bisect_left(matches, (offset + len(data) - longest + 1,))  # Later matches start after it
+            for match in matches[:done]:
+                yield match
+            del matches[:done]
+            keep = min(longest - 1, len(data))
+            offset += len(data) - keep
+            tail = data[len(data) - keep:]
+        for match in matches:
+            yield match
+
+
+class CD_chunker:
+    """ Content defined chunker. Cuts a stream where a gear rolling hash matches a boundary mask, so an
+    insertion only moves the boundaries around it (Xia et al., FastCDC, 2016) """
+    def __init__(self, min_size=2048, avg_size=8192, max_size=65536, read_size=CHUNK_SIZE):
+        """ Constructor
+        min_size: smallest chunk, except for the last one
+        avg_size: chunk size aimed at, rounded to a power of two
+        max_size: largest chunk, cut regardless of the content
+        read_size: number of bytes read from a file object at a time
+        """
+        if not 0 < min_size <= avg_size <= max_size:
+            raise ValueError('Chunk sizes should satisfy 0 < min_size <= avg_size <= max_size')
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        self.read_size = read_size
+        bits = avg_size.bit_length() - 1
+        # Boundary masks select the high bits, which depend on the last GEAR_BITS bytes
+        self.mask_small = ((1 << bits + NORMALISATION) - 1) << (GEAR_BITS - bits - NORMALISATION)
+        self.mask_large = ((1 << max(bits - NORMALISATION, 1)) - 1) << (GEAR_BITS - max(bits - NORMALISATION, 1))
+        generator = Random(GEAR_SEED)
+        self.gear = [generator.getrandbits(GEAR_BITS) for i in range(256)]
+        table = array('I', self.gear)
+        self.gear_table = table.tostring() if table.itemsize == 4 else None  # Packed for the rk extension
+
+    def cut(self, data, start, end):
+        """ Returns the end of the chunk starting at data[start], end when no boundary is found before it.
+        The gear hash is scanned by the rk extension when it is built, otherwise in Python at a few MB/s
+        data: bytearray holding the stream
+        end: end of the data available, at most start + max_size
+        """
+        if end - start <= self.min_size:
+            return end
+        normal = min(start + self.avg_size, end)
+        if rk is not None and self.gear_table is not None:
+            return rk.gear_cut(data, self.gear_table, start + self.min_size, normal, end, self.mask_small,
+                               self.mask_large)
+        gear = self.gear
+        bound = (1 << GEAR_BITS) - 1
+        mask = self.mask_small
+        h = 0
+        for i in range(start + self.min_size, normal):
+            h = ((h << 1) + gear[data[i]]) & bound
+            if not h & mask:
+                return i + 1
+        mask = self.mask_large
+        for i in range(normal, end):
+            h = ((h << 1) + gear[data[i]]) & bound
+            if not h & mask:
+                return i + 1
+        return end
+
+    def chunks(self, source):
+        """ Generator of the chunks of a stream, yields (offset, length, sha1 hex digest) tuples. Holds at
+        most max_size bytes plus one read of the stream
+        source: file object, byte sequence or iterable of byte sequences
+        """
+        pending = bytearray()
+        offset = 0  # Stream offset of pending[0]
+        for data in read_buffers(source, self.read_size):
+            pending += data
+            pos = 0
+            while len(pending) - pos >= self.max_size:
+                end = self.cut(pending, pos, pos + self.max_size)
+                yield offset + pos, end - pos, sha1(pending[pos:end]).hexdigest()
+                pos = end
+            del pending[:pos]
+            offset += pos
+        pos = 0
+        while pos < len(pending):
+            end = self.cut(pending, pos, len(pending))
+            yield offset + pos, end - pos, sha1(pending[pos:end]).hexdigest()
+            pos = end
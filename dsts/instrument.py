@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------
+# Description: Instrumentation of the hot paths. Phase timers, counters and
+#              peak sizes collected while instrumentation is switched on,
+#              either for the whole process by setting the DSTS_INSTRUMENT
+#              environment variable, or for a block of code using collect.
+#              When it is off, instrumented code does a single check per
+#              call. Results are read as a dictionary or exported as JSON
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ---------------------------------------------------------------------------
+
+import json
+import os
+from threading import local
+from time import time
+
+ENV_VAR = 'DSTS_INSTRUMENT'
+
+
+class Metrics:
+    """ Timers, counters and peaks collected by instrumented code """
+    def __init__(self):
+        self.timers = {}  # Name: seconds spent
+        self.counters = {}  # Name: total
+        self.peaks = {}  # Name: largest value seen
+
+    def timer(self, name):
+        """ Returns a context manager adding the time spent in its block to timer name """
+        return _Timer(self, name)
+
+    def add_time(self, name, seconds):
+        """ Adds seconds to timer name """
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def add(self, name, value=1):
+        """ Adds value to counter name """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def peak(self, name, value):
+        """ Records value as peak name when it is the largest seen """
+        if value > self.peaks.get(name, value - 1):
+            self.peaks[name] = value
+
+    def reset(self):
+        """ Clears every timer, counter and peak """
+        self.timers.clear()
+        self.counters.clear()
+        self.peaks.clear()
+
+    def as_dict(self):
+        """ Returns the metrics as {'timers': {...}, 'counters': {...}, 'peaks': {...}} """
+        return {'timers': dict(self.timers), 'counters': dict(self.counters), 'peaks': dict(self.peaks)}
+
+    def to_json(self):
+        """ Returns the metrics as a JSON object, see as_dict """
+        return json.dumps(self.as_dict(), sort_keys=True)
+
+
+class _Timer:
+    """ Context manager timing its block, see Metrics.timer """
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time()
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        self.metrics.add_time(self.name, time() - self.start)
+        return False
+
+
+class _NullTimer:
+    """ Context manager doing nothing, returned by timer when instrumentation is off """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+# Metrics of the whole process, collected when the environment variable is set
+process_metrics = Metrics() if os.environ.get(ENV_VAR) else None
+_state = local()  # Metrics of the collect blocks entered by each thread, innermost last
+
+
+def active():
+    """ Returns the Metrics collecting in this thread, None when instrumentation is off """
+    stack = getattr(_state, 'stack', None)
+    if stack:
+        return stack[-1]
+    return process_metrics
+
+
+def timer(name):
+    """ Returns a context manager timing its block into the active metrics, see Metrics.timer """
+    metrics = active()
+    if metrics is None:
+        return NULL_TIMER
+    return metrics.timer(name)
+
+
+class collect:
+    """ Context manager collecting the metrics of the code run in its block by this thread, e.g.
+
+        with collect() as metrics:
+            SuffixArray(text)
+        print metrics.to_json()
+    """
+    def __init__(self, metrics=None):
+        """ Constructor
+        metrics: Metrics to add to, defaults to new ones
+        """
+        self.metrics = metrics if metrics is not None else Metrics()
+
+    def __enter__(self):
+        if getattr(_state, 'stack', None) is None:
+            _state.stack = []
+        _state.stack.append(self.metrics)
+        return self.metrics
+
+    def __exit__(self, kind, value, traceback):
+        _state.stack.pop()
+        return False
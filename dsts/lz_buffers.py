@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------
+# Description: LZ factorisation of buffers and files into packed factor
+#              arrays, using the lz extension. Kept apart from the pure
+#              Python lz77 module so it can be used without the extension
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ---------------------------------------------------------------------------
+
+from array import array
+from itertools import izip
+from dsts.instrument import active
+from dsts.lz import factorise_arrays, refs_arrays
+from dsts.storage import map_file
+
+
+def _call_extension(name, function, data):
+    """ Calls a factorisation of the lz extension on data, timing it and counting the bytes and factors
+    when instrumentation is on, see dsts.instrument. Returns the factors as (offsets, lengths) arrays
+    """
+    metrics = active()
+    if metrics is None:
+        return _unpack_factors(function(data))
+    with metrics.timer(name):
+        factors = _unpack_factors(function(data))
+    metrics.add(name + '.bytes', len(data))
+    metrics.add(name + '.factors', len(factors[0]))
+    return factors
+
+
+def _unpack_factors(packed):
+    """ Converts packed (offsets, lengths) returned by the lz extension into a pair of array('l') """
+    offsets, lengths = array('l'), array('l')
+    offsets.fromstring(packed[0])
+    lengths.fromstring(packed[1])
+    return offsets, lengths
+
+
+def factorise_buffer(data):
+    """ LZ factorises a string or any object supporting the buffer protocol, e.g. bytearray or mmap.
+    Returns the factors as (offsets, lengths) arrays, character factors have the character code as
+    offset and a length of 0. See iter_factors
+    """
+    return _call_extension('lz.factorise', factorise_arrays, data)
+
+
+def factorise_file(path):
+    """ LZ factorises the contents of a file read through a memory map, see factorise_buffer """
+    data = map_file(path)
+    try:
+        return factorise_buffer(data)
+    finally:
+        data.close()
+
+
+def refs_buffer(data):
+    """ Returns the reference LZ factors of a string or buffer as (offsets, lengths) arrays """
+    return _call_extension('lz.refs', refs_arrays, data)
+
+
+def refs_file(path):
+    """ Returns the reference LZ factors of the contents of a file as (offsets, lengths) arrays """
+    data = map_file(path)
+    try:
+        return refs_buffer(data)
+    finally:
+        data.close()
+
+
+def iter_factors(offsets, lengths):
+    """ Generator converting factor arrays into the tuples returned by dsts.lz.factorise """
+    for offset, length in izip(offsets, lengths):
+        if length == 0:
+            yield chr(offset), 0
+        else:
+            yield offset, length
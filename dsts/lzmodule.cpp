@@ -12,28 +12,57 @@
 #include "external/dstsc/lzOG/src/lzOG.h"
 #include <iostream>
 #include <vector>
+#include <cstdlib>
+#include <cstring>
 
 using namespace std;
 
-// Returns all factors
-static PyObject* factorise(PyObject* self, PyObject* args)
+// Copies any object supporting the buffer protocol (string, bytearray, mmap, ...) into a NUL terminated
+// byte array, the terminator being used as the sentinel by lzOG. The copy also lets lzOG run without the
+// interpreter lock while other threads use the input. Returns NULL with an exception set on failure
+static unsigned char* copy_buffer(PyObject* args, Py_ssize_t* numofbytes)
 {
-    char* str;
-    int numofbytes; // string length
+    Py_buffer view;
 
-    if (!PyArg_ParseTuple(args, "s#", &str, &numofbytes))
+    if (!PyArg_ParseTuple(args, "s*", &view))
         return NULL;
 
-    if (numofbytes == 0)
+    if (view.len == 0)
         {
+        PyBuffer_Release(&view);
         PyErr_SetString(PyExc_TypeError, "Empty byte stream provided");
-        return NULL; 
-	}
+        return NULL;
+        }
+
+    unsigned char* text = (unsigned char*) malloc(view.len + 1);
+    if (text == NULL)
+        {
+        PyBuffer_Release(&view);
+        PyErr_NoMemory();
+        return NULL;
+        }
+    memcpy(text, view.buf, view.len);
+    text[view.len] = 0;
+    *numofbytes = view.len;
+    PyBuffer_Release(&view);
+    return text;
+}
+
+// Returns all factors
+static PyObject* factorise(PyObject* self, PyObject* args)
+{
+    Py_ssize_t numofbytes; // string length
+    unsigned char* str = copy_buffer(args, &numofbytes);
+    if (str == NULL)
+        return NULL;
 
     vector<LONGINT> offsets; // Store the factor offsets
     vector<LONGINT> lengths; // Store the length offsets
 
-    lz_factorise(numofbytes+1, (unsigned char*) str, offsets, lengths);
+    Py_BEGIN_ALLOW_THREADS
+    lz_factorise(numofbytes+1, str, offsets, lengths);
+    Py_END_ALLOW_THREADS
+    free(str);
 
     // Define tuple with LZ factors to return to the interpretter
     PyObject* tuple = PyTuple_New(offsets.size()-1);
@@ -56,22 +85,18 @@ static PyObject* factorise(PyObject* self, PyObject* args)
 // Return reference factors only
 static PyObject* refs(PyObject* self, PyObject *args)
 {
-    char* str;
-    int numofbytes; // string lenght
-
-    if (!PyArg_ParseTuple(args, "s#", &str, &numofbytes))
+    Py_ssize_t numofbytes; // string lenght
+    unsigned char* str = copy_buffer(args, &numofbytes);
+    if (str == NULL)
         return NULL;
 
-    if (numofbytes == 0)
-        {
-        PyErr_SetString(PyExc_TypeError, "Empty byte stream provided");
-        return NULL; 
-	}
-
     vector<LONGINT> offsets; // Store the factor offsets
     vector<LONGINT> lengths; // Store the length offsets
 
-    lz_refs(numofbytes+1, (unsigned char*) str, offsets, lengths);
+    Py_BEGIN_ALLOW_THREADS
+    lz_refs(numofbytes+1, str, offsets, lengths);
+    Py_END_ALLOW_THREADS
+    free(str);
 
     // Define tuple with LZ factors to return to the interpretter
     PyObject* tuple = PyTuple_New(offsets.size());
@@ -80,11 +105,74 @@ static PyObject* refs(PyObject* self, PyObject *args)
 
     return tuple;
 }
+
+// Packs factors into two strings of native longs, read by array('l').fromstring on the Python side
+static PyObject* pack_factors(vector<LONGINT>& offsets, vector<LONGINT>& lengths, size_t count)
+{
+    PyObject* packed_offsets = PyString_FromStringAndSize(NULL, count * sizeof(long));
+    PyObject* packed_lengths = PyString_FromStringAndSize(NULL, count * sizeof(long));
+    if (packed_offsets == NULL || packed_lengths == NULL)
+        {
+        Py_XDECREF(packed_offsets);
+        Py_XDECREF(packed_lengths);
+        return NULL;
+        }
+
+    long* offset_items = (long*) PyString_AS_STRING(packed_offsets);
+    long* length_items = (long*) PyString_AS_STRING(packed_lengths);
+    for(size_t i = 0; i < count; i++)
+        {
+        offset_items[i] = (long) offsets[i];
+        length_items[i] = (long) lengths[i];
+        }
+
+    return Py_BuildValue("NN", packed_offsets, packed_lengths);
+}
+
+// Returns all factors as packed (offsets, lengths), a character factor has its character as offset and length 0
+static PyObject* factorise_arrays(PyObject* self, PyObject* args)
+{
+    Py_ssize_t numofbytes;
+    unsigned char* text = copy_buffer(args, &numofbytes);
+    if (text == NULL)
+        return NULL;
+
+    vector<LONGINT> offsets; // Store the factor offsets
+    vector<LONGINT> lengths; // Store the length offsets
+
+    Py_BEGIN_ALLOW_THREADS
+    lz_factorise(numofbytes+1, text, offsets, lengths);
+    Py_END_ALLOW_THREADS
+    free(text);
+
+    return pack_factors(offsets, lengths, offsets.size() - 1);
+}
+
+// Returns reference factors only as packed (offsets, lengths)
+static PyObject* refs_arrays(PyObject* self, PyObject* args)
+{
+    Py_ssize_t numofbytes;
+    unsigned char* text = copy_buffer(args, &numofbytes);
+    if (text == NULL)
+        return NULL;
+
+    vector<LONGINT> offsets; // Store the factor offsets
+    vector<LONGINT> lengths; // Store the length offsets
+
+    Py_BEGIN_ALLOW_THREADS
+    lz_refs(numofbytes+1, text, offsets, lengths);
+    Py_END_ALLOW_THREADS
+    free(text);
+
+    return pack_factors(offsets, lengths, offsets.size());
+}
  
 static PyMethodDef LzMethods[] =
 {
      {"factorise", factorise, METH_VARARGS},
      {"refs", refs, METH_VARARGS},
+     {"factorise_arrays", factorise_arrays, METH_VARARGS},
+     {"refs_arrays", refs_arrays, METH_VARARGS},
      {NULL, NULL, 0, NULL}
 };
  
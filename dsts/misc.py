@@ -33,3 +33,21 @@ def get_smp_file(sampleFile):
     tmp_str = f.read()
     f.close()
     return tmp_str
+
+
+def as_bytes(data):
+    """ Returns a byte string view of data supporting len, indexing and slicing like a string, without
+    copying it when possible
+    data: str, unicode (encoded as utf8), bytearray, mmap, memoryview (copied, buffer cannot wrap it in
+          python 2) or another object supporting the buffer interface
+    """
+    if isinstance(data, (str, buffer)):
+        return data
+    if isinstance(data, unicode):
+        return data.encode("utf8")
+    if isinstance(data, memoryview):
+        return data.tobytes()
+    try:
+        return buffer(data)
+    except TypeError:
+        raise TypeError('%s does not support the buffer interface' % type(data).__name__)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------
+# Description: Block parallel compression and factorisation. Splits the
+#              input into blocks processed by a pool of worker processes.
+#              Thread pool helpers building many suffix arrays and LZ
+#              factorisations, the extensions releasing the interpreter lock
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ---------------------------------------------------------------------------
+
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from dsts.compression import lz77, read_varint, write_varint
+from dsts.lz import factorise
+from dsts.misc import as_bytes
+from dsts.suffix_array import SuffixArray
+
+# Block container: magic, version, then varints for the block size, window size, dictionary size (0 when blocks
+# are not primed) and number of blocks. Followed by the index, a varint input length and container length per
+# block, and the lz77 containers of the blocks
+BLOCK_MAGIC = 'DLZB'
+BLOCK_VERSION = 1
+
+
+def _map(function, items, processes):
+    """ Applies function to every item using a pool of processes, or in this process when processes is 1 """
+    if processes == 1:
+        return map(function, items)
+    pool = Pool(processes)
+    try:
+        return pool.map(function, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _compress_block(args):
+    """ Compresses a block into an lz77 container, args is (block, window size, dictionary) """
+    block, window_size, dictionary = args
+    encoder = lz77()
+    encoder.encode(block, window_size, dictionary)
+    return encoder.to_bytes()
+
+
+def _decompress_block(args):
+    """ Decompresses an lz77 container, args is (container, dictionary) """
+    data, dictionary = args
+    return lz77.from_bytes(data, dictionary).decode(dictionary)
+
+
+def compress_blocks(var, block_size=1 << 20, window_size=32768, prime=False, processes=None):
+    """ Compresses a string block by block in parallel, returns a block container
+    var: string or bytes like object to compress, e.g. a bytearray or mmap
+    block_size: number of characters per block
+    window_size: lz77 window size
+    prime: encode every block with the end of the previous one as a dictionary. This improves compression
+           but a block can then only be decompressed once the previous one is
+    processes: number of worker processes, defaults to the number of CPUs
+    """
+    var = as_bytes(var)
+    dictionary_size = min(window_size, block_size) if prime else 0
+    blocks = []
+    for start in range(0, len(var), block_size):
+        blocks.append((var[start:start + block_size], window_size, var[max(start - dictionary_size, 0):start]))
+    payloads = _map(_compress_block, blocks, processes)
+
+    out = bytearray(BLOCK_MAGIC)
+    out.append(BLOCK_VERSION)
+    for value in (block_size, window_size, dictionary_size, len(blocks)):
+        write_varint(out, value)
+    for (block, window, dictionary), payload in zip(blocks, payloads):
+        write_varint(out, len(block))
+        write_varint(out, len(payload))
+    for payload in payloads:
+        out += payload
+    return str(out)
+
+
+def read_block_index(data):
+    """ Parses the header of a block container, returns (dictionary size, [(input offset, input length,
+    container offset, container length), ...])
+    """
+    data = bytearray(data)
+    if data[:len(BLOCK_MAGIC)] != BLOCK_MAGIC or len(data) <= len(BLOCK_MAGIC):
+        raise ValueError('Not an lz77 block container')
+    if data[len(BLOCK_MAGIC)] != BLOCK_VERSION:
+        raise ValueError('Unsupported lz77 block container version %s' % data[len(BLOCK_MAGIC)])
+    pos = len(BLOCK_MAGIC) + 1
+    block_size, pos = read_varint(data, pos)
+    window_size, pos = read_varint(data, pos)
+    dictionary_size, pos = read_varint(data, pos)
+    count, pos = read_varint(data, pos)
+    lengths = []
+    for i in range(count):
+        length, pos = read_varint(data, pos)
+        payload_length, pos = read_varint(data, pos)
+        lengths.append((length, payload_length))
+    index = []
+    offset = 0
+    for length, payload_length in lengths:
+        index.append((offset, length, pos, payload_length))
+        offset += length
+        pos += payload_length
+    if pos != len(data):
+        raise ValueError('Truncated lz77 block container')
+    return dictionary_size, index
+
+
+def decompress_blocks(data, processes=None):
+    """ Decompresses a block container produced by compress_blocks, in parallel unless its blocks are primed
+    processes: number of worker processes, defaults to the number of CPUs
+    """
+    dictionary_size, index = read_block_index(data)
+    if dictionary_size == 0:
+        return ''.join(_map(_decompress_block, [(data[pos:pos + size], '') for offset, length, pos, size in index],
+                            processes))
+    output = ''
+    for offset, length, pos, size in index:  # Every block needs the end of the previous one
+        output += _decompress_block((data[pos:pos + size], output[max(len(output) - dictionary_size, 0):]))
+    return output
+
+
+def decompress_block(data, block, dictionary=''):
+    """ Decompresses a single block of a block container
+    block: number of the block
+    dictionary: end of the previous block's output, needed when blocks are primed
+    """
+    dictionary_size, index = read_block_index(data)
+    offset, length, pos, size = index[block]
+    if dictionary_size == 0 or block == 0:
+        dictionary = ''
+    elif len(dictionary) < dictionary_size:
+        raise ValueError('Block %s needs the last %s characters of the previous block' % (block, dictionary_size))
+    return _decompress_block((data[pos:pos + size], dictionary[len(dictionary) - dictionary_size:]))
+
+
+def factorise_blocks(var, block_size=1 << 20, processes=None):
+    """ LZ factorises a string block by block in parallel, returns a list of (block offset, factors) where
+    factor offsets are relative to their block
+    """
+    var = as_bytes(var)
+    starts = range(0, len(var), block_size)
+    return zip(starts, _map(factorise, [var[start:start + block_size] for start in starts], processes))
+
+
+def _thread_map(function, items, threads):
+    """ Applies function to every item using a pool of threads """
+    pool = ThreadPool(threads)
+    try:
+        return pool.map(function, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def build_many(strings, threads=None, compact=False):
+    """ Builds a SuffixArray for each string using a pool of threads. Sorting runs without the interpreter
+    lock, so it scales with the number of cores while lcp derivation runs one thread at a time
+    threads: number of threads, defaults to the number of CPUs
+    compact: see SuffixArray
+    """
+    return _thread_map(lambda string: SuffixArray(string, compact=compact), strings, threads)
+
+
+def factorise_many(strings, threads=None):
+    """ LZ factorises each string using a pool of threads, see build_many """
+    return _thread_map(factorise, strings, threads)
@@ -0,0 +1,154 @@
+/*
+------------------------------------------------------------------
+ Description: Rabin & Karp module, python bindings for the rolling
+ 	      hash of every window of a byte sequence and the gear
+ 	      hash boundary scan of the content defined chunker.
+ Author: Angelos Molfetas (2013)
+ Copyright: The University of Melbourne (2013)
+ Licence: BSD licence, see attached LICENCE file
+ -----------------------------------------------------------------
+*/
+
+#include <Python.h>
+#include <stdint.h>
+
+// Largest hash range, so hashes fit in a 4 byte long, and base, so products fit in 64 bit arithmetic
+#define MAX_HASH_RANGE 2147483648ULL
+#define MAX_BASE 4294967296ULL
+
+// Stores the hash of every block_size window of a byte sequence in out, a writable buffer holding one long
+// per window, e.g. an array('l')
+static PyObject* hash_all(PyObject* self, PyObject* args)
+{
+    Py_buffer view; // input string, or any object supporting the buffer protocol
+    Py_ssize_t block_size;
+    unsigned long long base;
+    unsigned long long hash_range;
+    PyObject* out;
+    void* buffer;
+    Py_ssize_t bufferlength;
+
+    if (!PyArg_ParseTuple(args, "s*nKKO", &view, &block_size, &base, &hash_range, &out))
+        return NULL;
+
+    if (block_size < 1 || base < 1 || base >= MAX_BASE || hash_range < 1 || hash_range > MAX_HASH_RANGE)
+        {
+        PyBuffer_Release(&view);
+        PyErr_SetString(PyExc_ValueError, "Block size, base or hash range out of range");
+        return NULL;
+        }
+
+    Py_ssize_t count = view.len >= block_size ? view.len - block_size + 1 : 0;
+    if (PyObject_AsWriteBuffer(out, &buffer, &bufferlength) < 0)
+        {
+        PyBuffer_Release(&view);
+        return NULL;
+        }
+    if (bufferlength != count * (Py_ssize_t) sizeof(long))
+        {
+        PyBuffer_Release(&view);
+        PyErr_SetString(PyExc_ValueError, "Buffer should hold one long per window of the byte sequence");
+        return NULL;
+        }
+
+    if (count > 0)
+        {
+        const unsigned char* data = (const unsigned char*) view.buf;
+        long* hashes = (long*) buffer;
+
+        Py_BEGIN_ALLOW_THREADS
+        unsigned long long high_power = 1; // Weight of the outgoing character, base ** (block_size - 1)
+        for(Py_ssize_t i = 1; i < block_size; i++)
+            high_power = high_power * base % hash_range;
+        unsigned long long outgoing[256]; // Contribution of each byte value leaving the window
+        for(int byte = 0; byte < 256; byte++)
+            outgoing[byte] = byte * high_power % hash_range;
+        unsigned long long h = 0;
+        for(Py_ssize_t i = 0; i < block_size; i++)
+            h = (h * base + data[i]) % hash_range;
+        hashes[0] = (long) h;
+        for(Py_ssize_t i = block_size; i < view.len; i++)
+            {
+            // Add hash_range when subtracting would go negative, keeping the hash positive like Python's modulo
+            unsigned long long leaving = outgoing[data[i - block_size]];
+            h = h >= leaving ? h - leaving : h + hash_range - leaving;
+            h = (h * base + data[i]) % hash_range;
+            hashes[i - block_size + 1] = (long) h;
+            }
+        Py_END_ALLOW_THREADS
+        }
+
+    PyBuffer_Release(&view);
+    Py_INCREF(out);
+    return out;
+}
+
+// Returns the position after the first byte from start where the gear hash matches no bit of its mask,
+// mask_small before normal and mask_large from it, or end when there is none. The hash starts at 0 at start
+static PyObject* gear_cut(PyObject* self, PyObject* args)
+{
+    Py_buffer view; // chunker's pending bytes
+    Py_buffer table; // gear table, 256 native 4 byte integers
+    Py_ssize_t start, normal, end;
+    unsigned long mask_small, mask_large;
+
+    if (!PyArg_ParseTuple(args, "s*s*nnnkk", &view, &table, &start, &normal, &end, &mask_small, &mask_large))
+        return NULL;
+
+    if (table.len != 256 * (Py_ssize_t) sizeof(uint32_t) || start < 0 || start > normal || normal > end ||
+        end > view.len)
+        {
+        PyBuffer_Release(&view);
+        PyBuffer_Release(&table);
+        PyErr_SetString(PyExc_ValueError, "Gear table should hold 256 integers and 0 <= start <= normal <= end <= len(data)");
+        return NULL;
+        }
+
+    const unsigned char* data = (const unsigned char*) view.buf;
+    const uint32_t* gear = (const uint32_t*) table.buf;
+    uint32_t small = (uint32_t) mask_small;
+    uint32_t large = (uint32_t) mask_large;
+    Py_ssize_t cut = end;
+    uint32_t h = 0; // Wraps at 32 bits, the chunker's GEAR_BITS
+
+    Py_BEGIN_ALLOW_THREADS
+    Py_ssize_t i = start;
+    for(; i < normal; i++)
+        {
+        h = (h << 1) + gear[data[i]];
+        if (!(h & small))
+            {
+            cut = i + 1;
+            break;
+            }
+        }
+    if (cut == end)
+        for(; i < end; i++)
+            {
+            h = (h << 1) + gear[data[i]];
+            if (!(h & large))
+                {
+                cut = i + 1;
+                break;
+                }
+            }
+    Py_END_ALLOW_THREADS
+
+    PyBuffer_Release(&view);
+    PyBuffer_Release(&table);
+    return PyInt_FromSsize_t(cut);
+}
+
+static PyMethodDef rkMethods[] =
+{
+     {"hash_all", hash_all, METH_VARARGS},
+     {"gear_cut", gear_cut, METH_VARARGS},
+     {NULL, NULL, 0, NULL}
+};
+
+PyMODINIT_FUNC
+
+initrk(void)
+{
+     (void) Py_InitModule("rk", rkMethods);
+}
@@ -12,30 +12,85 @@
 #include "external/dstsc/SAIS-SK/src/sk-sain.h"
 #include <iostream>
 #include <vector>
+#include <stdint.h>
+#include <cstdlib>
+#include <cstring>
 
 using namespace std;
 
+// Copies the suffix array into a writable buffer of 4 or 8 byte integers, e.g. an array.array
+static PyObject* fill_buffer(PyObject* out, unsigned long *suftab, Py_ssize_t numofbytes)
+{
+    void* buffer;
+    Py_ssize_t bufferlength;
+
+    if (PyObject_AsWriteBuffer(out, &buffer, &bufferlength) < 0)
+        return NULL;
+
+    if (bufferlength == numofbytes * 4)
+        {
+        uint32_t* items = (uint32_t*) buffer;
+        for(Py_ssize_t i = 1; i < numofbytes+1; i++)
+            items[i-1] = (uint32_t) suftab[i];
+        }
+    else if (bufferlength == numofbytes * 8)
+        {
+        uint64_t* items = (uint64_t*) buffer;
+        for(Py_ssize_t i = 1; i < numofbytes+1; i++)
+            items[i-1] = (uint64_t) suftab[i];
+        }
+    else
+        {
+        PyErr_SetString(PyExc_ValueError, "Buffer should hold one 4 or 8 byte integer per byte of the string");
+        return NULL;
+        }
+
+    Py_INCREF(out);
+    return out;
+}
+
 static PyObject* sort(PyObject* self, PyObject* args)
 {
-    char* str;
-    int numofbytes; // string lenght
+    Py_buffer view; // input string, or any object supporting the buffer protocol
+    Py_ssize_t numofbytes; // string lenght
+    unsigned char* str; // NUL terminated copy of the input, the terminator is the sorter's sentinel
     unsigned long *suftab; // pointer to suffix array
+    PyObject* out = NULL; // optional buffer to store the suffix array in
 
-    if (!PyArg_ParseTuple(args, "z#", &str, &numofbytes))
+    if (!PyArg_ParseTuple(args, "s*|O", &view, &out))
         return NULL;
 
+    numofbytes = view.len;
     if (numofbytes == 0)
         {
+        PyBuffer_Release(&view);
         PyErr_SetString(PyExc_TypeError, "Empty byte stream provided");
         return NULL; 
 	}
 
-    suftab = gt_sain_plain_sortsuffixes((unsigned char*) str, numofbytes + 1, false);
+    // Copy the input so it cannot change while sorting without the interpreter lock
+    str = (unsigned char*) malloc(numofbytes + 1);
+    if (str == NULL)
+        {
+        PyBuffer_Release(&view);
+        return PyErr_NoMemory();
+        }
+    memcpy(str, view.buf, numofbytes);
+    str[numofbytes] = 0;
+    PyBuffer_Release(&view);
+
+    Py_BEGIN_ALLOW_THREADS
+    suftab = gt_sain_plain_sortsuffixes(str, numofbytes + 1, false);
+    Py_END_ALLOW_THREADS
+    free(str);
+
+    if (out != NULL) // Store the suffix array in the supplied buffer without building a tuple
+        return fill_buffer(out, suftab, numofbytes);
 
     // Define tuple with LZ factors to return to the interpretter
     PyObject* tuple = PyTuple_New(numofbytes);
-    for(int i = 1; i < numofbytes+1; i++) // Store the suffix array in Tuple
-	PyTuple_SetItem(tuple, i-1, Py_BuildValue("i", suftab[i]));
+    for(Py_ssize_t i = 1; i < numofbytes+1; i++) // Store the suffix array in Tuple
+	PyTuple_SetItem(tuple, i-1, PyInt_FromSsize_t(suftab[i]));
 
     return tuple;
 }
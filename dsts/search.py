@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------
+# Description: Repeat search. Finds maximal and super maximal repeats in
+#              one bottom up pass over the lcp intervals of a suffix array
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ---------------------------------------------------------------------------
+
+from dsts.suffix_array import SuffixArray
+
+# Left context states of an lcp interval
+EMPTY = 0  # No rows seen yet
+START = 1  # Row starting at the beginning of the string, cannot be extended left
+MIXED = 2  # Rows preceded by different characters, the interval is left maximal
+
+
+def _left_char(sarray, row):
+    """ Returns the character preceding the suffix at row, START when there is none """
+    pos = sarray.suffix_array[row]
+    if pos == 0:
+        return START
+    return sarray.str[pos - 1]
+
+
+def _merge_left(first, second):
+    """ Merges the left contexts of two sets of rows """
+    if first == EMPTY:
+        return second
+    if second == EMPTY:
+        return first
+    if first == second and first != START:
+        return first
+    return MIXED
+
+
+def lcp_intervals(sarray):
+    """ Generator of the lcp intervals of a suffix array, bottom up in one pass using a stack
+    (Abouelhoda, Kurtz & Ohlebusch, 2004). Yields (length, lo, hi, left_maximal, leaf) tuples, where
+    rows lo to hi - 1 share a prefix of the given length, left_maximal is set when their preceding
+    characters differ, and leaf when no two of them share a longer prefix
+    """
+    if not isinstance(sarray, SuffixArray):
+        sarray = SuffixArray(sarray)
+    lcp = sarray.lcp_array
+    length = len(sarray.suffix_array)
+    stack = [[0, 0, EMPTY, True]]  # Open intervals: [lcp, lo, left context, leaf]
+    for i in range(1, length + 1):
+        row_left = _left_char(sarray, i - 1)
+        stack[-1][2] = _merge_left(stack[-1][2], row_left)
+        current = lcp[i] if i < length else -1
+        lo = i - 1
+        last = None  # Last interval closed at this row, a child of the next one
+        while current < stack[-1][0]:
+            last = stack.pop()
+            lo = last[1]
+            if last[0] > 0:
+                yield last[0], last[1], i, last[2] == MIXED, last[3]
+            if stack and current <= stack[-1][0]:
+                stack[-1][2] = _merge_left(stack[-1][2], last[2])
+                stack[-1][3] = False
+            elif not stack:
+                return
+        if current > stack[-1][0]:
+            if last is None:
+                stack.append([current, lo, row_left, True])
+            else:
+                stack.append([current, lo, last[2], False])
+
+
+def _left_distinct(sarray, lo, hi):
+    """ Returns True when the suffixes at rows lo to hi - 1 are all preceded by different characters """
+    if hi - lo > 257:  # More rows than possible preceding characters
+        return False
+    seen = set()
+    for row in range(lo, hi):
+        char = _left_char(sarray, row)
+        if char in seen:
+            return False
+        seen.add(char)
+    return True
+
+
+def maximal_repeats(sarray, min_length=1, min_occurrences=2):
+    """ Generator of maximal repeats, substrings whose occurrences can be extended neither left nor right
+    as a whole. Yields (length, lo, hi), the occurrences are sarray.suffix_array[lo:hi]
+    sarray: SuffixArray or string to search
+    min_length: shortest repeat to report
+    min_occurrences: least number of occurrences to report
+    """
+    for length, lo, hi, left_maximal, leaf in lcp_intervals(sarray):
+        if left_maximal and length >= min_length and hi - lo >= min_occurrences:
+            yield length, lo, hi
+
+
+def super_maximal_repeats_left(sarray, min_length=1, min_occurrences=2):
+    """ Generator of left super maximal repeats, maximal repeats whose occurrences are all preceded by
+    different characters, so no left extension of it is repeated. Yields (length, lo, hi), see maximal_repeats
+    """
+    if not isinstance(sarray, SuffixArray):
+        sarray = SuffixArray(sarray)
+    for length, lo, hi, left_maximal, leaf in lcp_intervals(sarray):
+        if left_maximal and length >= min_length and hi - lo >= min_occurrences and _left_distinct(sarray, lo, hi):
+            yield length, lo, hi
+
+
+def super_maximal_repeats_right(sarray, min_length=1, min_occurrences=2):
+    """ Generator of right super maximal repeats, maximal repeats whose occurrences are all followed by
+    different characters, so no right extension of it is repeated. Yields (length, lo, hi), see maximal_repeats
+    """
+    for length, lo, hi, left_maximal, leaf in lcp_intervals(sarray):
+        if leaf and left_maximal and length >= min_length and hi - lo >= min_occurrences:
+            yield length, lo, hi
+
+
+def super_maximal_repeats(sarray, min_length=1, min_occurrences=2):
+    """ Generator of super maximal repeats, repeats that do not occur within any other repeat.
+    Yields (length, lo, hi), see maximal_repeats
+    """
+    if not isinstance(sarray, SuffixArray):
+        sarray = SuffixArray(sarray)
+    for length, lo, hi, left_maximal, leaf in lcp_intervals(sarray):
+        if leaf and left_maximal and length >= min_length and hi - lo >= min_occurrences and \
+                _left_distinct(sarray, lo, hi):
+            yield length, lo, hi
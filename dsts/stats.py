@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------
+# Description: Substring statistics. Occurrence counts of repeated
+#              substrings, top k substrings by frequency or by length times
+#              frequency and n-gram counts, all from one pass over the lcp
+#              array of a suffix array
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ---------------------------------------------------------------------------
+
+from heapq import heappush, heappushpop
+from dsts.search import lcp_intervals
+from dsts.suffix_array import SuffixArray
+
+
+def substring_classes(sarray, min_length=1, min_occurrences=2):
+    """ Generator of the classes of repeated substrings. Substrings prefixing the same rows occur at the
+    same positions, so each lcp interval stands for every substring between its parent interval's lcp and
+    its own. Yields (shortest, longest, lo, hi) tuples, where each prefix of the suffix at row lo of
+    length shortest to longest occurs hi - lo times, at sarray.suffix_array[lo:hi]
+    sarray: SuffixArray or string to analyse
+    min_length: shortest substring to report, shorter substrings of a class are left out
+    min_occurrences: least number of occurrences to report
+    """
+    if not isinstance(sarray, SuffixArray):
+        sarray = SuffixArray(sarray)
+    lcp = sarray.lcp_array
+    rows = len(lcp)
+    for length, lo, hi, left_maximal, leaf in lcp_intervals(sarray):
+        if length < min_length or hi - lo < min_occurrences:
+            continue
+        parent = max(lcp[lo], lcp[hi] if hi < rows else 0, 0)  # The longer bound belongs to the parent
+        yield max(parent + 1, min_length), length, lo, hi
+
+
+def _top_k(sarray, k, min_length, min_occurrences, score):
+    """ Returns the k substring classes with the highest score(length, count) as (length, lo, hi) tuples,
+    best first, keeping at most k of them at a time
+    """
+    heap = []
+    for shortest, longest, lo, hi in substring_classes(sarray, min_length, min_occurrences):
+        item = (score(longest, hi - lo), longest, -lo, hi)  # Ties go to the longer, then earlier row
+        if len(heap) < k:
+            heappush(heap, item)
+        elif item > heap[0]:
+            heappushpop(heap, item)
+    return [(length, -lo, hi) for value, length, lo, hi in sorted(heap, reverse=True)]
+
+
+def top_k_frequent(sarray, k, min_length=1, min_occurrences=2):
+    """ Returns the k most frequent substrings at least min_length long as (length, lo, hi) tuples, most
+    frequent first. A class's substrings all occur as often, so only its longest substring is reported,
+    see substring_classes
+    """
+    return _top_k(sarray, k, min_length, min_occurrences, lambda length, count: count)
+
+
+def top_k_gain(sarray, k, min_length=1, min_occurrences=2):
+    """ Returns the k substrings with the largest length times number of occurrences, an estimate of the
+    space saved by compressing them, as (length, lo, hi) tuples, best first, see top_k_frequent
+    """
+    return _top_k(sarray, k, min_length, min_occurrences, lambda length, count: length * count)
+
+
+def ngrams(sarray, min_n, max_n=None):
+    """ Generator of the n-grams of a string for n from min_n to max_n, each with its rows. Yields
+    (n, lo, hi) tuples, where the n-gram prefixing the suffix at row lo occurs hi - lo times, at
+    sarray.suffix_array[lo:hi]. N-grams of the same n are yielded in sorted order
+    sarray: SuffixArray or string to analyse
+    max_n: longest n-gram, defaults to min_n
+    """
+    if not isinstance(sarray, SuffixArray):
+        sarray = SuffixArray(sarray)
+    if max_n is None:
+        max_n = min_n
+    if min_n < 1 or max_n < min_n:
+        raise ValueError('N-gram lengths should satisfy 1 <= min_n <= max_n')
+    lcp = sarray.lcp_array
+    rows = len(sarray.suffix_array)
+    starts = [0] * (max_n - min_n + 1)  # First row of the current group of each n
+    for row in range(1, rows + 1):
+        shared = lcp[row] if row < rows else -1
+        # Rows sharing fewer than n characters with the previous one start a new group of n-grams
+        for n in range(max(shared + 1, min_n), max_n + 1):
+            lo = starts[n - min_n]
+            if sarray.get_sarray_item_len(lo) >= n:  # A lone row may be shorter than n
+                yield n, lo, row
+            starts[n - min_n] = row
+
+
+def ngram_histogram(sarray, min_n, max_n=None):
+    """ Returns the frequency of frequencies of the n-grams for n from min_n to max_n, as a dictionary
+    mapping n to a dictionary mapping a number of occurrences to the number of n-grams occurring as often
+    """
+    histogram = {}
+    for n in range(min_n, (max_n or min_n) + 1):
+        histogram[n] = {}
+    for n, lo, hi in ngrams(sarray, min_n, max_n):
+        counts = histogram[n]
+        counts[hi - lo] = counts.get(hi - lo, 0) + 1
+    return histogram
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+# --------------------------------------------------------------------------
+# Description: Helpers to write fixed width little endian integer arrays to
+#              files and read them back from memory mapped files in place
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ---------------------------------------------------------------------------
+
+from array import array
+from mmap import mmap, ACCESS_READ
+from struct import Struct
+
+CHUNK_SIZE = 65536  # Number of integers packed per write
+
+
+def index_typecode(length, signed=False):
+    """ Returns the smallest array module typecode able to hold offsets into a string of given length """
+    if signed:
+        return 'i' if length < 2 ** 31 else 'l'
+    return 'I' if length < 2 ** 32 else 'L'
+
+
+def write_array(f, values, fmt):
+    """ Writes a sequence of integers to file object f as fixed width integers
+    values: integer sequence, e.g. list, tuple or array
+    fmt: struct format of a single integer, e.g. '<I'
+    """
+    for start in range(0, len(values), CHUNK_SIZE):
+        chunk = values[start:start + CHUNK_SIZE]
+        f.write(Struct('%s%s%s' % (fmt[0], len(chunk), fmt[1:])).pack(*chunk))
+
+
+def map_file(path):
+    """ Returns a read only memory map of the file at path """
+    f = open(path, 'rb')
+    try:
+        return mmap(f.fileno(), 0, access=ACCESS_READ)
+    finally:
+        f.close()  # The map stays valid after the file is closed
+
+
+class MappedArray:
+    """ Read only integer sequence decoded on access from a buffer, e.g. a memory map, without copying it """
+    def __init__(self, buf, offset, length, fmt):
+        """ Constructor
+        buf: buffer holding the integers
+        offset: position of the first integer in buf
+        length: number of integers
+        fmt: struct format of a single integer, e.g. '<I'
+        """
+        self.buf = buf
+        self.offset = offset
+        self.length = length
+        self.fmt = fmt
+        self.item = Struct(fmt)
+        if offset + length * self.item.size > len(buf):
+            raise ValueError('Buffer too small for %s integers of %s bytes' % (length, self.item.size))
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self.length)
+            if step != 1:
+                return array('l', [self[j] for j in range(start, stop, step)])
+            count = max(stop - start, 0)
+            return array('l', Struct('%s%s%s' % (self.fmt[0], count, self.fmt[1:])).unpack_from(
+                self.buf, self.offset + start * self.item.size))
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError('MappedArray index out of range')
+        return self.item.unpack_from(self.buf, self.offset + i * self.item.size)[0]
+
+    def __iter__(self):
+        for start in range(0, self.length, CHUNK_SIZE):
+            for value in self[start:start + CHUNK_SIZE]:
+                yield value
+
+    def __repr__(self):
+        return 'MappedArray(%s, %s)' % (self.fmt, self.length)
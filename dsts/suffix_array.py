@@ -7,39 +7,169 @@
 # Licence: BSD Licence, see attached LICENCE file
 # ---------------------------------------------------------------------------
 
+from array import array
+from bisect import bisect_right
 from pprint import pprint
 from operator import itemgetter
+from struct import Struct
+from time import time
+from dsts.instrument import active, timer
+from dsts.misc import as_bytes
 from dsts.sa import sort
+from dsts.storage import MappedArray, index_typecode, map_file, write_array
+
+# Suffix array file: header, text, then as little endian integers of the header's width the suffix array, lcp
+# array and, from version 2, the LCP-LR arrays llcp and rlcp, so searches need not rebuild them after open
+SA_FILE_MAGIC = 'DSTSSA'
+SA_FILE_VERSION = 2
+SA_FILE_VERSIONS = (1, 2)  # Versions open reads, version 1 files have no LCP-LR arrays
+SA_FILE_HEADER = Struct('<6sHHQ')  # magic, version, integer width, text length
+SA_FILE_FORMATS = {4: ('<I', '<i'), 8: ('<Q', '<q')}  # width: (suffix array format, lcp array format)
+
+# Terminates every document of a GeneralisedSuffixArray. It must sort before every other character
+DOC_SEPARATOR = '\x00'
 
 
 class SuffixArray:
     """ Suffix Array """
-    def __init__(self, string):
+    def __init__(self, string, suffix_array=None, lcp_array=None, compact=False):
         """ Constructor, builds and sorts the array
-        string: string to process
+        string: string or bytes like object to process, e.g. a bytearray or mmap, which is read in place.
+                unicode strings are encoded as utf8
+        suffix_array: previously built suffix array of string, skips sorting
+        lcp_array: previously derived lcp array of string, requires suffix_array
+        compact: store the suffix array as an array of 4 or 8 byte integers rather than a tuple
         """
-        if isinstance(string, unicode):
-            self.str = string.encode("utf8")
+        self.str = as_bytes(string)
+        self.compact = compact
+        if suffix_array is None:
+            self.generate_suffix_array()
         else:
-            self.str = string
-        self.generate_suffix_array()
+            self.suffix_array = suffix_array
+            if lcp_array is None:
+                self.derive_lcp_array()
+            else:
+                self.lcp_array = lcp_array
+                self.lcp_lr = None
 
     def __str__(self):
         """ Printing this object returns the suffix array """
         return str(self.get_suffix_array())
 
+    def save(self, path):
+        """ Saves the string, suffix array, lcp array and LCP-LR arrays to a file that can be loaded using open """
+        length = len(self.str)
+        width = 4 if length < 2 ** 31 else 8
+        sa_format, lcp_format = SA_FILE_FORMATS[width]
+        if self.lcp_lr is None:
+            self.derive_lcp_lr_arrays()
+        llcp, rlcp = self.lcp_lr
+        f = open(path, 'wb')
+        try:
+            f.write(SA_FILE_HEADER.pack(SA_FILE_MAGIC, SA_FILE_VERSION, width, length))
+            f.write(self.str)
+            write_array(f, self.suffix_array, sa_format)
+            write_array(f, self.lcp_array, lcp_format)
+            write_array(f, llcp, lcp_format)
+            write_array(f, rlcp, lcp_format)
+        finally:
+            f.close()
+
+    @classmethod
+    def open(cls, path):
+        """ Loads a suffix array saved using save. The file is memory mapped and read in place, so it
+        is shared by every process opening it
+        """
+        data = map_file(path)
+        if len(data) < SA_FILE_HEADER.size:
+            raise ValueError('%s is not a suffix array file' % path)
+        magic, version, width, length = SA_FILE_HEADER.unpack_from(data)
+        if magic != SA_FILE_MAGIC:
+            raise ValueError('%s is not a suffix array file' % path)
+        if version not in SA_FILE_VERSIONS or width not in SA_FILE_FORMATS:
+            raise ValueError('Unsupported suffix array file version %s, width %s' % (version, width))
+        sa_format, lcp_format = SA_FILE_FORMATS[width]
+        sa_offset = SA_FILE_HEADER.size + length
+        lcp_offset = sa_offset + length * width
+        sarray = cls._mapped(buffer(data, SA_FILE_HEADER.size, length),
+                             MappedArray(data, sa_offset, length, sa_format),
+                             MappedArray(data, lcp_offset, length, lcp_format))
+        if version >= 2:
+            llcp_offset = lcp_offset + length * width
+            sarray.lcp_lr = (MappedArray(data, llcp_offset, length, lcp_format),
+                             MappedArray(data, llcp_offset + length * width, length, lcp_format))
+        sarray.mapped_file = data
+        return sarray
+
+    @classmethod
+    def _mapped(cls, string, suffix_array, lcp_array):
+        """ Returns an instance over the string, suffix array and lcp array read by open """
+        return cls(string, suffix_array=suffix_array, lcp_array=lcp_array)
+
     def generate_suffix_array(self):
         """ Generates the suffix and lcp array """
-        self.suffix_array = sort(self.str)
+        with timer('suffix_array.sort'):
+            if self.compact:  # Sort straight into an integer array sized for the string
+                self.suffix_array = sort(self.str, array(index_typecode(len(self.str)), [0]) * len(self.str))
+            else:
+                self.suffix_array = sort(self.str)
         self.derive_lcp_array()
 
     def derive_lcp_array(self):
-        """ Derive lcp array """
-        self.lcp_array = [-1, ]
-        for i in range(len(self.suffix_array) - 1):
-            string1 = self.str[self.get_pos(i):]
-            string2 = self.str[self.get_pos(i + 1):]
-            self.lcp_array.append(self.compare_strings(string1, string2))
+        """ Derive lcp array in linear time using Kasai et al.'s (2001) algorithm. The first
+        entry has no predecessor and is set to -1
+        """
+        self.lcp_lr = None  # LCP-LR arrays depend on the lcp array, rebuilt on the next range search
+        metrics = active()
+        if metrics:
+            started = time()
+        length = len(self.suffix_array)
+        rank = array(index_typecode(length), [0]) * length  # Inverse suffix array, rank[pos] = row of suffix at pos
+        for i in range(length):
+            rank[self.suffix_array[i]] = i
+        self.lcp_array = array(index_typecode(length, signed=True), [0]) * length
+        if length:
+            self.lcp_array[0] = -1
+        string = self.str
+        matched = 0  # lcp of previous text position, lower bound for the next one minus one
+        for pos in range(length):
+            row = rank[pos]
+            if row == 0:
+                matched = 0
+                continue
+            prev_pos = self.suffix_array[row - 1]
+            while pos + matched < length and prev_pos + matched < length and \
+                    string[pos + matched] == string[prev_pos + matched]:
+                matched += 1
+            self.lcp_array[row] = matched
+            if matched > 0:
+                matched -= 1
+        if metrics:
+            metrics.add_time('suffix_array.lcp', time() - started)
+            self._count_lcp(metrics, rank)
+
+    def _count_lcp(self, metrics, rank):
+        """ Reports the sizes of the arrays and the character comparisons made by derive_lcp_array. Each
+        row compares the characters its lcp gained over the one carried from the previous text position,
+        plus a mismatch unless a suffix ran out, so they are counted afterwards rather than in the loop
+        """
+        length = len(self.suffix_array)
+        comparisons = 0
+        carried = 0
+        for pos in range(length):
+            row = rank[pos]
+            if row == 0:
+                carried = 0
+                continue
+            matched = self.lcp_array[row]
+            comparisons += matched - carried
+            if pos + matched < length and self.suffix_array[row - 1] + matched < length:
+                comparisons += 1  # The mismatch
+            carried = max(matched - 1, 0)
+        metrics.add('suffix_array.bytes', len(self.str))
+        metrics.add('suffix_array.lcp.comparisons', comparisons)
+        metrics.peak('suffix_array.rows', length)
+        metrics.peak('suffix_array.array_bytes', length * (rank.itemsize + self.lcp_array.itemsize))
 
     def compare_strings(self, string1, string2):
         """ Compares two strings left to right, and returns where characters matched """
@@ -53,7 +183,7 @@ class SuffixArray:
 
     def get_lcp_array(self):
         """ Return Long Common Prefix array """
-        return self.lcp_array
+        return list(self.lcp_array)
 
     def return_array_as_string(self):
         """ Return the contents of the array """
@@ -72,7 +202,7 @@ class SuffixArray:
 
     def get_pos_reverse(self, pos):
         """ Returns the position of the suffix array element in the original string in relation to the end of the string """
-        return len(self.str) - len(self.get_sarray_item(pos))
+        return len(self.str) - self.get_sarray_item_len(pos)
 
     def get_sarray_item(self, i):
         """ Returns row from suffix array at position i """
@@ -80,7 +210,12 @@ class SuffixArray:
 
     def get_sarray_item_len(self, i):
         """ Returns row length from suffix array at position i """
-        return len(self.str[self.get_pos(i):])
+        return len(self.str) - self.get_pos(i)
+
+    def get_sarray_prefix(self, i, length):
+        """ Returns at most the first 'length' characters of row i, without copying the rest of the suffix """
+        pos = self.get_pos(i)
+        return self.str[pos:pos + length]
 
     def get_suffix_array(self):
         """ Returns the suffix array """
@@ -118,69 +253,202 @@ class SuffixArray:
         """ Searches the suffix array for a substring using binary search on prefixes, returns first instance """
         lo = 0
         hi = len(self.str)
+        length = len(target)
         while hi > lo:
             middle = (lo + hi) / 2
-            if target == self.get_sarray_item(middle)[0:len(target)]:
+            prefix = self.get_sarray_prefix(middle, length)
+            if target == prefix:
                 return middle
-            elif target > self.get_sarray_item(middle)[0:len(target)]:
+            elif target > prefix:
                 lo = middle + 1
             else:
                 hi = middle
         return -1  # not found
 
     def search_all(self, target):
-        """ Searches the suffix array for substring using binary search on prefixes, returns all instances """
-        positions = []  # store all matches here
-        found = None    # store first instance found
-
-        # Find first instance
-
+        """ Searches the suffix array for substring using binary search on prefixes, returns all instances.
+        The instance found first is returned first, followed by the rows after and then before it
+        """
         middle = self.search_SA(target)
 
         if middle == -1:  # nothing found
             return []
-        else:
-            pos = self.get_pos(middle)
-            positions.append(pos)
-        if middle != len(self.str):  # not at the end of the SA
-            for i in range(middle + 1, len(self.str)):
-                if target == self.get_sarray_item(i)[0:len(target)]:
-                    positions.append(self.get_pos(i))
-                else:
-                    break
-        if middle != 0:  # not at the beginning of the SA
-            for i in range(middle - 1, -1, -1):
-                if target == self.get_sarray_item(i)[0:len(target)]:
-                    positions.append(self.get_pos(i))
-                else:
-                    break
+        lo, hi = self.search_range(target)
+        positions = [self.get_pos(middle)]
+        for i in range(middle + 1, hi):
+            positions.append(self.get_pos(i))
+        for i in range(middle - 1, lo - 1, -1):
+            positions.append(self.get_pos(i))
         return positions
 
+    def search_range(self, target):
+        """ Searches the suffix array using the LCP-LR arrays (Manber & Myers, 1993) in O(m + log n)
+        returns the interval (lo, hi) of rows prefixed by target, lo == hi when it is not found.
+        Occurrences are suffix_array[lo:hi]
+        """
+        return self._find_bound(target, False), self._find_bound(target, True)
+
+    def count(self, target):
+        """ Returns the number of instances of a substring """
+        lo, hi = self.search_range(target)
+        return hi - lo
+
+    def search_many(self, patterns):
+        """ Searches for several substrings in one sweep of the suffix array, returns an array('l') of
+        positions for each pattern, in the order the patterns were given
+        """
+        return [array('l', self.suffix_array[lo:hi]) for lo, hi in self._search_ranges(patterns)]
+
+    def count_many(self, patterns):
+        """ Counts instances of several substrings in one sweep, returns an array('l') of counts """
+        return array('l', [hi - lo for lo, hi in self._search_ranges(patterns)])
+
+    def _search_ranges(self, patterns):
+        """ Returns the search_range of every pattern. Patterns are visited in sorted order so that each
+        search starts from the previous lower bound and stays within the interval of any preceding
+        pattern that is a prefix of it
+        """
+        ranges = [None] * len(patterns)
+        prefixes = []  # Stack of (pattern, lo, hi) for visited patterns that prefix the current one
+        prev_lo = 0
+        for idx in sorted(range(len(patterns)), key=patterns.__getitem__):
+            target = patterns[idx]
+            while prefixes and not target.startswith(prefixes[-1][0]):
+                prefixes.pop()
+            if prefixes and prefixes[-1][0] == target:  # Repeated pattern
+                ranges[idx] = prefixes[-1][1:]
+                continue
+            if prefixes:
+                lo, hi = max(prev_lo, prefixes[-1][1]), prefixes[-1][2]
+            else:
+                lo, hi = prev_lo, len(self.suffix_array)
+            lo = self._bisect_rows(target, lo, hi, False)
+            hi = self._bisect_rows(target, lo, hi, True)
+            ranges[idx] = (lo, hi)
+            prefixes.append((target, lo, hi))
+            prev_lo = lo
+        return ranges
+
+    def _bisect_rows(self, target, lo, hi, upper):
+        """ Returns the first row between lo and hi not preceding target, see _precedes """
+        length = len(target)
+        while hi > lo:
+            middle = (lo + hi) / 2
+            prefix = self.get_sarray_prefix(middle, length)
+            if prefix < target or (upper and prefix == target):
+                lo = middle + 1
+            else:
+                hi = middle
+        return lo
+
+    def derive_lcp_lr_arrays(self):
+        """ Derive the lcp of every binary search midpoint with its left (llcp) and right (rlcp) bound """
+        length = len(self.suffix_array)
+        llcp = array(index_typecode(length, signed=True), [0]) * length
+        rlcp = array(index_typecode(length, signed=True), [0]) * length
+
+        def interval_lcp(lo, hi):
+            """ Fills midpoints between lo and hi, returns the lcp of rows lo and hi """
+            if hi - lo == 1:
+                return self.lcp_array[hi]
+            middle = (lo + hi) / 2
+            llcp[middle] = interval_lcp(lo, middle)
+            rlcp[middle] = interval_lcp(middle, hi)
+            return min(llcp[middle], rlcp[middle])
+
+        if length > 1:
+            interval_lcp(0, length - 1)
+        self.lcp_lr = (llcp, rlcp)
+
+    def _match_length(self, target, i, matched):
+        """ Returns the lcp of target and row i, knowing the first 'matched' characters are equal """
+        pos = self.get_pos(i)
+        end = min(len(target), len(self.str) - pos)
+        while matched < end and self.str[pos + matched] == target[matched]:
+            matched += 1
+        return matched
+
+    def _precedes(self, target, i, matched, upper):
+        """ Returns True when row i sorts before target given their lcp. With upper set rows prefixed
+        by target also sort before it
+        """
+        if matched == len(target):
+            return upper
+        pos = self.get_pos(i) + matched
+        if pos == len(self.str):
+            return True
+        return self.str[pos] < target[matched]
+
+    def _find_bound(self, target, upper):
+        """ Returns the first row not preceding target, see _precedes """
+        length = len(self.suffix_array)
+        if length == 0:
+            return 0
+        if self.lcp_lr is None:
+            self.derive_lcp_lr_arrays()
+        llcp, rlcp = self.lcp_lr
+
+        lo = 0
+        lo_lcp = self._match_length(target, lo, 0)
+        if not self._precedes(target, lo, lo_lcp, upper):
+            return lo
+        hi = length - 1
+        hi_lcp = self._match_length(target, hi, 0)
+        if self._precedes(target, hi, hi_lcp, upper):
+            return length
+
+        # Invariant: row lo precedes target and row hi does not
+        while hi - lo > 1:
+            middle = (lo + hi) / 2
+            if lo_lcp >= hi_lcp:
+                if llcp[middle] > lo_lcp:
+                    lo = middle
+                    continue
+                elif llcp[middle] < lo_lcp:
+                    hi, hi_lcp = middle, llcp[middle]
+                    continue
+                matched = self._match_length(target, middle, lo_lcp)
+            else:
+                if rlcp[middle] > hi_lcp:
+                    hi = middle
+                    continue
+                elif rlcp[middle] < hi_lcp:
+                    lo, lo_lcp = middle, rlcp[middle]
+                    continue
+                matched = self._match_length(target, middle, hi_lcp)
+            if self._precedes(target, middle, matched, upper):
+                lo, lo_lcp = middle, matched
+            else:
+                hi, hi_lcp = middle, matched
+        return hi
+
     def find_SA_pos(self, target):
         """ Searches for sorted position of target within Suffix Array """
         lo = 0
         hi = len(self.suffix_array)
         middle = (lo + hi) / 2
+        # One character past the target is enough to order it against a whole suffix
+        length = len(target) + 1
         while hi > lo:
-            prev = middle
             middle = (lo + hi) / 2
-            if target == self.get_sarray_item(middle):
+            prefix = self.get_sarray_prefix(middle, length)
+            if target == prefix:
                 return middle
-            elif target > self.get_sarray_item(middle):
+            elif target > prefix:
                 lo = middle + 1
             else:
                 hi = middle
 
-        if target > self.get_sarray_item(middle):
+        if target > self.get_sarray_prefix(middle, length):
             return hi
         else:
             return lo
 
     def find_longest_common_string_pairs(self):
-        """ Searches for the common substrings through the original string """
-
-        # Reserve memory for list to store pairs of strings
-        string_copies = [None] * len(self.lcp_array)
+        """ Searches for the common substrings through the original string, returns a dictionary mapping
+        the end offset of each substring to (offset, replica_offset, length) of the longest pair ending there.
+        See dsts.search for maximal and super maximal repeats
+        """
         duplicates = {}  # Used to store identified string pairs and filter out smaller substrings. value = (offset, replica_offset, length)
 
         for i in range(1, len(self.lcp_array)):
@@ -189,13 +457,260 @@ class SuffixArray:
                 secon_str = max(self.suffix_array[i], self.suffix_array[i - 1])
                 length = self.lcp_array[i]
                 end_first_str = first_str + length
-                print i, (first_str, secon_str, length)
                 if end_first_str > secon_str:  # If suffixes are overlapping
                     length = secon_str - first_str  # Reduce their length so they don't overlap
                     end_first_str = first_str + length
-                print i, (first_str, secon_str, length), "*"
                 if end_first_str not in duplicates:  # if no value then add it
                     duplicates[end_first_str] = (first_str, secon_str, length)
                 elif duplicates[end_first_str][2] < length:  # if length of previous value is smaller replace
                     duplicates[end_first_str] = (first_str, secon_str, length)
-        print duplicates
+        return duplicates
+
+
+class ReverseSuffixArray(SuffixArray):
+    """ Suffix array of the reversed string. Each row is a prefix of the string read right to left from
+    where it ends, so searches are anchored at the end of matches, positions relative to the end of the
+    string need no translation, and rows sharing an lcp share their left context. Targets and returned
+    positions refer to the string as given, not reversed
+    """
+    def __init__(self, string, suffix_array=None, lcp_array=None, compact=False):
+        """ Constructor, builds and sorts the array of the reversed string
+        string: string or bytes like object to process, see SuffixArray
+        suffix_array, lcp_array: previously built arrays of the reversed string
+        compact: see SuffixArray
+        """
+        SuffixArray.__init__(self, as_bytes(string)[::-1], suffix_array, lcp_array, compact)
+
+    @classmethod
+    def _mapped(cls, string, suffix_array, lcp_array):
+        """ Returns an instance over the reversed string saved by save, see SuffixArray.open """
+        sarray = cls('', suffix_array=suffix_array, lcp_array=lcp_array)
+        sarray.str = string
+        return sarray
+
+    def return_original_str(self):
+        """ Returns the original string """
+        return self.str[::-1]
+
+    def get_end(self, i):
+        """ Returns the offset in the original string where the prefix at row i ends """
+        return len(self.str) - self.suffix_array[i]
+
+    def get_pos_reverse(self, i):
+        """ Returns the number of characters following the prefix at row i in the original string """
+        return self.suffix_array[i]
+
+    def search(self, target):
+        """ Searches for a substring, returns the position of the first instance found or -1 """
+        row = self.search_SA(target[::-1])
+        if row == -1:
+            return -1  # not found
+        return self.get_end(row) - len(target)
+
+    def search_reverse(self, target):
+        """ Searches for a substring, returns the number of characters following the first instance found
+        or -1
+        """
+        row = self.search_SA(target[::-1])
+        if row == -1:
+            return -1  # not found
+        return self.get_pos_reverse(row)
+
+    def search_all(self, target):
+        """ Searches for all instances of a substring, returns their positions ordered by the text preceding
+        them read right to left
+        """
+        lo, hi = self.search_range(target)
+        return [self.get_end(i) - len(target) for i in range(lo, hi)]
+
+    def search_range(self, target):
+        """ Returns the interval of rows ending with target, see SuffixArray.search_range """
+        return SuffixArray.search_range(self, target[::-1])
+
+    def search_many(self, patterns):
+        """ Searches for several substrings in one sweep, see SuffixArray.search_many """
+        return [array('l', [self.get_end(i) - len(pattern) for i in range(lo, hi)])
+                for pattern, (lo, hi) in zip(patterns, self._search_ranges(patterns))]
+
+    def _search_ranges(self, patterns):
+        """ Returns the search_range of every pattern, see SuffixArray._search_ranges """
+        return SuffixArray._search_ranges(self, [pattern[::-1] for pattern in patterns])
+
+    def left_extensions(self, target):
+        """ Returns the characters preceding the instances of a substring as (character, count) tuples in
+        character order. An instance at the start of the string has no preceding character and is not
+        counted. Takes O(k log n) for k distinct characters without visiting every instance
+        """
+        reverse = target[::-1]
+        lo, hi = SuffixArray.search_range(self, reverse)
+        if lo < hi and self.get_sarray_item_len(lo) == len(target):  # Shortest row, sorts first
+            lo += 1
+        extensions = []
+        while lo < hi:
+            char = self.str[self.get_pos(lo) + len(target)]
+            end = self._bisect_rows(reverse + char, lo, hi, True)
+            extensions.append((char, end - lo))
+            lo = end
+        return extensions
+
+
+class GeneralisedSuffixArray(SuffixArray):
+    """ Suffix array of several documents, sorted in one go over the documents each terminated by
+    DOC_SEPARATOR. Positions are reported as (document id, offset) pairs, and the lcp array is cut at
+    document ends so matches and repeats never cross a document boundary
+    """
+    def __init__(self, documents, suffix_array=None, lcp_array=None, compact=False):
+        """ Constructor, builds and sorts the array
+        documents: list of strings to process, or a string of documents each terminated by DOC_SEPARATOR
+        suffix_array, lcp_array, compact: see SuffixArray
+        """
+        if isinstance(documents, (list, tuple)):
+            encoded = []
+            for document in documents:
+                document = as_bytes(document)[:]
+                if DOC_SEPARATOR in document:
+                    raise ValueError('Documents cannot contain the document separator')
+                encoded.append(document)
+            starts = [0]
+            for document in encoded:
+                starts.append(starts[-1] + len(document) + 1)
+            string = DOC_SEPARATOR.join(encoded) + DOC_SEPARATOR
+        else:
+            string = as_bytes(documents)
+            starts = [0]
+            for pos in range(len(string)):
+                if string[pos] == DOC_SEPARATOR:
+                    starts.append(pos + 1)
+        # Offset of every document, followed by the string length
+        self.doc_starts = array(index_typecode(len(string)), starts)
+        SuffixArray.__init__(self, string, suffix_array, lcp_array, compact)
+
+    def derive_lcp_array(self):
+        """ Derive lcp array, cut at the end of each suffix's document """
+        SuffixArray.derive_lcp_array(self)
+        for row in range(1, len(self.lcp_array)):
+            pos = self.get_pos(row)
+            doc_end = self.doc_starts[bisect_right(self.doc_starts, pos)] - 1  # Offset of the separator
+            if self.lcp_array[row] > doc_end - pos:
+                self.lcp_array[row] = doc_end - pos
+
+    def get_doc_count(self):
+        """ Returns the number of documents """
+        return len(self.doc_starts) - 1
+
+    def get_document(self, doc_id):
+        """ Returns the document with the given id """
+        return self.str[self.doc_starts[doc_id]:self.doc_starts[doc_id + 1] - 1]
+
+    def get_doc_pos(self, pos):
+        """ Returns the (document id, offset) pair of a position in the string """
+        doc_id = bisect_right(self.doc_starts, pos) - 1
+        return doc_id, pos - self.doc_starts[doc_id]
+
+    def search(self, target):
+        """ Searches for a substring, returns the (document id, offset) of the first instance found or -1 """
+        if DOC_SEPARATOR in target:
+            return -1
+        pos = SuffixArray.search(self, target)
+        if pos == -1:
+            return -1  # not found
+        return self.get_doc_pos(pos)
+
+    def search_all(self, target):
+        """ Searches for all instances of a substring, returns their (document id, offset) pairs """
+        if DOC_SEPARATOR in target:
+            return []
+        return [self.get_doc_pos(pos) for pos in SuffixArray.search_all(self, target)]
+
+    def search_range(self, target):
+        """ Returns the interval of rows prefixed by target, see SuffixArray.search_range """
+        if DOC_SEPARATOR in target:
+            return 0, 0
+        return SuffixArray.search_range(self, target)
+
+    def _search_ranges(self, patterns):
+        """ Returns the search_range of every pattern, see SuffixArray._search_ranges """
+        ranges = SuffixArray._search_ranges(self, patterns)
+        return [(0, 0) if DOC_SEPARATOR in pattern else bounds for pattern, bounds in zip(patterns, ranges)]
+
+
+class IncrementalSuffixArray:
+    """ Appendable suffix array, kept as a log structured list of SuffixArray segments. Appending builds a
+    suffix array of the new chunk only, and segments are merged as they grow so each byte is sorted
+    O(log n) times. Queries search every segment plus the text around segment boundaries
+    """
+    def __init__(self, string=None):
+        """ Constructor
+        string: initial string to index, optional
+        """
+        self.segments = []  # (offset, SuffixArray) tuples, sizes decreasing from the first segment
+        self.length = 0
+        if string:
+            self.append(string)
+
+    def __len__(self):
+        return self.length
+
+    def append(self, chunk):
+        """ Appends a chunk to the indexed string """
+        if not chunk:
+            return
+        sarray = SuffixArray(chunk)
+        self.segments.append((self.length, sarray))
+        self.length += len(sarray.str)
+        # Merge the last segments while the newer one is at least as long, like a binary counter
+        while len(self.segments) > 1 and len(self.segments[-2][1].str) <= len(self.segments[-1][1].str):
+            last = self.segments.pop()[1]
+            offset, prev = self.segments.pop()
+            self.segments.append((offset, SuffixArray(prev.str[:] + last.str[:])))
+
+    def return_original_str(self):
+        """ Returns the indexed string """
+        return self.get_substring(0, self.length)
+
+    def get_substring(self, start, end):
+        """ Returns the indexed string between start and end offsets """
+        parts = []
+        for offset, sarray in self.segments:
+            if offset < end and offset + len(sarray.str) > start:
+                parts.append(sarray.str[max(start - offset, 0):end - offset])
+        return ''.join(parts)
+
+    def search(self, target):
+        """ Searches for a substring, returns its first position or -1 when not found """
+        positions = self.search_all(target)
+        return positions[0] if positions else -1
+
+    def search_all(self, target):
+        """ Searches for all instances of a substring, returns their positions in increasing order """
+        if not target:
+            return []
+        positions = []
+        for offset, sarray in self.segments:
+            lo, hi = sarray.search_range(target)
+            positions.extend(offset + sarray.get_pos(i) for i in range(lo, hi))
+        positions.extend(self._search_boundaries(target))
+        return sorted(positions)
+
+    def count(self, target):
+        """ Returns the number of instances of a substring """
+        if not target:
+            return 0
+        total = sum(sarray.count(target) for offset, sarray in self.segments)
+        return total + len(self._search_boundaries(target))
+
+    def _search_boundaries(self, target):
+        """ Returns the positions of instances crossing a segment boundary. Each instance is reported at the
+        first boundary it crosses, so it starts in the segment before it
+        """
+        positions = []
+        length = len(target)
+        for k in range(1, len(self.segments)):
+            boundary = self.segments[k][0]
+            start = max(boundary - length + 1, self.segments[k - 1][0])
+            window = self.get_substring(start, boundary + length - 1)
+            pos = window.find(target)
+            while pos != -1 and start + pos < boundary:
+                positions.append(start + pos)
+                pos = window.find(target, pos + 1)
+        return positions
@@ -13,6 +13,8 @@ lz = Extension('dsts.lz', include_dirs=['dsts/external/dstc/lzOG/src/', 'dsts/ex
                         'dsts/external/dstsc/SAIS-SK/src/fileopen.cpp', 'dsts/external/dstsc/SAIS-SK/src/gt-alloc.cpp',
                         'dsts/external/dstsc/SAIS-SK/src/sk-sain.cpp'])
 
+rk = Extension('dsts.rk', sources=['dsts/rkmodule.cpp'])
+
 # When this script is run, we want to unsure that the distc package is installed
 # The distc package has C++ code that is required when building the lz extension
 if not exists("dsts/external/dstsc/SAIS-SK/") or not exists("dsts/external/dstsc/lzOG/"):
@@ -25,5 +27,5 @@ setup(name="dsts",
       author_email="angelos.molfetas@unimelb.edu.au",
       packages=['dsts'],
       long_description="Python data structures. Suffix array Construction Algorithm, Rabin & Karp fingerprint generator, LZ factorisor.",
-      ext_modules=[lz, sa],
+      ext_modules=[lz, sa, rk],
       )
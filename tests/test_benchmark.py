@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+
+# ----------------------------------------------------------------
+# Description: Testing module for the benchmark suite. Uses nosetest
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ----------------------------------------------------------------
+
+from dsts.benchmark.suite import compare
+from nose.tools import assert_equal
+
+
+def result(case, throughput, peak_kb, name='dna'):
+    """ Returns a result dictionary as run_case does, with the fields compare reads """
+    return {'case': case, 'input': name, 'throughput': throughput, 'unit': 'bytes', 'peak_kb': peak_kb}
+
+
+class TestBenchmark:
+    """ Testing module for the benchmark suite """
+    def test_compare_no_regression(self):
+        """ BENCHMARK: Changes within the tolerance are not regressions """
+        baseline = [result('sort', 100.0, 1000)]
+        assert_equal(compare([result('sort', 95.0, 1050)], baseline, 0.1), [])
+        assert_equal(compare([result('sort', 200.0, 500)], baseline, 0.1), [])
+
+    def test_compare_regressions(self):
+        """ BENCHMARK: Slower and larger cases are regressions """
+        baseline = [result('sort', 100.0, 1000), result('lcp', 100.0, 1000)]
+        regressions = compare([result('sort', 80.0, 1000), result('lcp', 100.0, 1200)], baseline, 0.1)
+        assert_equal(len(regressions), 2)
+        assert regressions[0].startswith('sort on dna: throughput')
+        assert regressions[1].startswith('lcp on dna: peak memory')
+
+    def test_compare_unmatched(self):
+        """ BENCHMARK: Cases missing from the baseline or without a throughput are skipped """
+        baseline = [result('sort', None, 1000), result('sort', 100.0, 1000, 'runs')]
+        assert_equal(compare([result('sort', 1.0, 1000), result('lcp', 1.0, 1000)], baseline, 0.1), [])
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+# ----------------------------------------------------------------
+# Description: Testing module for the build cache. Uses nosetest
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ----------------------------------------------------------------
+
+from dsts.cache import BuildCache
+from dsts.lz import factorise
+from dsts.lz_buffers import iter_factors
+from dsts.misc import get_smp_file
+from dsts.suffix_array import SuffixArray
+from nose.tools import assert_equal
+from shutil import rmtree
+from tempfile import mkdtemp
+
+
+class TestBuildCache:
+    """ Testing module for the cache of suffix arrays and LZ factorisations """
+    def setup(self):
+        """ CACHE: Creates an empty cache directory for each test """
+        self.directory = mkdtemp()
+        self.text = get_smp_file('hamlet1.txt')
+
+    def teardown(self):
+        """ CACHE: Removes the cache directory """
+        rmtree(self.directory)
+
+    def test_suffix_array(self):
+        """ CACHE: Suffix arrays are built once and read back from the cache """
+        cache = BuildCache(self.directory)
+        built = cache.suffix_array(self.text)
+        cached = BuildCache(self.directory).suffix_array(self.text)  # As another process would
+        assert_equal(cache.misses, 1)
+        assert_equal(list(cached.suffix_array), list(SuffixArray(self.text).suffix_array))
+        assert_equal(cached.get_lcp_array(), built.get_lcp_array())
+        assert_equal(cached.search_all('the'), built.search_all('the'))
+
+    def test_factorise(self):
+        """ CACHE: Factorisations are built once and read back as factor arrays """
+        cache = BuildCache(self.directory)
+        assert_equal(tuple(iter_factors(*cache.factorise(self.text))), factorise(self.text))
+        other = BuildCache(self.directory)
+        offsets, lengths = other.factorise(bytearray(self.text))
+        assert_equal(tuple(iter_factors(offsets, lengths)), factorise(self.text))
+        assert_equal((other.hits, other.misses), (1, 0))
+
+    def test_memory(self):
+        """ CACHE: Recently used results are kept in memory """
+        cache = BuildCache(self.directory, memory_items=1)
+        sarray = cache.suffix_array(self.text)
+        assert cache.suffix_array(self.text) is sarray
+        cache.suffix_array('abracadabra')
+        assert cache.suffix_array(self.text) is not sarray  # Dropped from memory, read from disk
+
+    def test_eviction(self):
+        """ CACHE: Least recently used results are evicted over the size limit """
+        cache = BuildCache(self.directory, max_bytes=len(self.text) * 12)
+        for i in range(5):
+            cache.suffix_array(self.text + str(i))
+        assert sum(size for last_use, size, path in cache.entries()) <= len(self.text) * 12
+        assert len(cache.entries()) < 5
+        cache.clear()
+        assert_equal(cache.entries(), [])
+
+    def test_invalid_entry(self):
+        """ CACHE: Entries that are not complete results are rebuilt """
+        cache = BuildCache(self.directory)
+        cache.suffix_array(self.text)
+        for last_use, size, path in cache.entries():
+            with open(path, 'wb') as f:
+                f.write('truncated')
+        assert_equal(BuildCache(self.directory).suffix_array(self.text).search_all('the'),
+                     SuffixArray(self.text).search_all('the'))
@@ -8,11 +8,38 @@
 # Licence: BSD Licence, see attached LICENCE file
 # ----------------------------------------------------------------
 
-from dsts.compression import lz77
+from dsts.compression import LZ77_MAGIC, MAX_CHAIN, lz77
+from dsts.misc import get_smp_file
+from os import close, remove
+from tempfile import mkstemp
 
 from nose.tools import assert_equal, raises
 
 
+def window_scan(var, window_size):
+    """ Returns the lz77 instructions found by comparing every window position, nearest last so ties keep
+    the nearest match, as encode did before it used hash chains
+    """
+    instructions = []
+    coding_pos = 0
+    while coding_pos < len(var):
+        limit = len(var) - coding_pos - 1  # Leave a character to follow the match
+        longest_pos, longest_size = None, 0
+        for ptr in range(max(coding_pos - window_size, 0), coding_pos):
+            size = 0
+            while ptr + size <= coding_pos and coding_pos + size < len(var) and var[ptr + size] == var[coding_pos + size]:
+                size += 1
+            size = min(size, limit)
+            if size and longest_size <= size:
+                longest_pos, longest_size = ptr, size
+        if longest_pos is None:
+            instructions.append((0, 0, var[coding_pos]))
+        else:
+            instructions.append((coding_pos - longest_pos, longest_size, var[coding_pos + longest_size]))
+        coding_pos += longest_size + 1
+    return instructions
+
+
 class TestLZ77:
     """ LZ77 encoder and decoder testing module """
 
@@ -24,3 +51,163 @@ class TestLZ77:
         encoder.print_instructions()
         var2 = encoder.decode()
         assert_equal(var, var2)
+
+    def test_encode_instructions(self):
+        """ Test the instructions produced when encoding a string """
+        encoder = lz77()
+        encoder.encode("abcabcd", 16)
+        assert_equal(encoder.instructions, [(0, 0, 'a'), (0, 0, 'b'), (0, 0, 'c'), (3, 3, 'd')])
+        encoder.encode("abcabcd", 2)  # Repeat is out of the window
+        assert_equal(encoder.instructions, [(0, 0, 'a'), (0, 0, 'b'), (0, 0, 'c'), (0, 0, 'a'), (0, 0, 'b'),
+                                            (0, 0, 'c'), (0, 0, 'd')])
+
+    def test_encode_match_at_end(self):
+        """ Test encoding a string ending with a repeat """
+        encoder = lz77()
+        encoder.encode("abcabc", 16)
+        assert_equal(encoder.instructions, [(0, 0, 'a'), (0, 0, 'b'), (0, 0, 'c'), (3, 2, 'c')])
+        assert_equal(encoder.decode(), "abcabc")
+
+    def test_encode_and_decode_sample(self):
+        """ Test encoding and decoding a sample file """
+        var = get_smp_file('hamlet1.txt')
+        encoder = lz77()
+        encoder.encode(var, 4096)
+        assert_equal(var, encoder.decode())
+
+    def test_encode_bytes_like(self):
+        """ Test encoding a bytearray and a buffer """
+        encoder = lz77()
+        encoder.encode("abcabcd", 16)
+        expected = encoder.instructions
+        for var in (bytearray("abcabcd"), buffer("abcabcd")):
+            encoder.encode(var, 16)
+            assert_equal(encoder.instructions, expected)
+            assert_equal(encoder.decode(), "abcabcd")
+
+    def test_encode_matches_window_scan(self):
+        """ Test encoding without chain limits gives the instructions of a scan of the whole window """
+        for var, window_size in ((get_smp_file('hamlet1.txt'), 32768), (get_smp_file('hamlet2.txt')[:4000], 1024),
+                                 ("a" * 300 + "ab" * 200, 32768)):
+            encoder = lz77()
+            encoder.encode(var, window_size)
+            assert_equal(encoder.instructions, window_scan(var, window_size))
+
+    def test_encode_chain_limits(self):
+        """ Test encoding with the hash chain walk cut short """
+        var = "a" * 2000 + get_smp_file('hamlet1.txt')
+        for max_chain, good_enough in ((1, 128), (128, 4), (0, 0)):
+            encoder = lz77()
+            encoder.encode(var, 32768, max_chain=max_chain, good_enough=good_enough)
+            assert_equal(encoder.decode(), var)
+        encoder = lz77()
+        encoder.encode("a" * 2000, 32768, max_chain=MAX_CHAIN, good_enough=64)
+        assert max(item[1] for item in encoder.instructions) <= 65
+
+    def test_decode_overlapping_reference(self):
+        """ Test decoding references longer than their distance """
+        decoder = lz77()
+        decoder.instructions = [(0, 0, 'a'), (1, 4, 'b'), (3, 7, 'c')]
+        assert_equal(decoder.decode(), "aaaaabaabaabac")
+
+    @raises(ValueError)
+    def test_decode_zero_distance(self):
+        """ Test decoding a reference with a distance of 0 """
+        decoder = lz77()
+        decoder.instructions = [(0, 0, 'a'), (0, 3, 'b')]
+        decoder.decode()
+
+    @raises(ValueError)
+    def test_decode_distance_out_of_range(self):
+        """ Test decoding a reference before the start of the output """
+        decoder = lz77()
+        decoder.instructions = [(0, 0, 'a'), (2, 1, 'b')]
+        decoder.decode()
+
+    @raises(ValueError)
+    def test_decode_stream_zero_distance(self):
+        """ Test decoding a reference with a distance of 0 in chunks """
+        decoder = lz77()
+        decoder.instructions = [(0, 0, 'a'), (0, 3, 'b')]
+        list(decoder.decode_stream())
+
+    def test_decode_stream(self):
+        """ Test decoding in chunks """
+        var = get_smp_file('hamlet1.txt')
+        encoder = lz77()
+        encoder.encode(var, 256)
+        chunks = list(encoder.decode_stream(chunk_size=100))
+        assert_equal(var, "".join(chunks))
+        assert len(chunks) > 1
+
+    def test_container(self):
+        """ Test packing instructions into a binary container and reading them back """
+        var = get_smp_file('hamlet2.txt')
+        encoder = lz77()
+        encoder.encode(var, 32768)
+        data = encoder.to_bytes()
+        assert len(data) < len(var)
+        decoder = lz77.from_bytes(data)
+        assert_equal(decoder.instructions, encoder.instructions)
+        assert_equal(decoder.window_size, 32768)
+        assert_equal(decoder.decode(), var)
+
+    def test_container_file(self):
+        """ Test saving instructions to a file and opening it """
+        encoder = lz77()
+        encoder.encode("Hello,zHelios_yes", 16)
+        handle, path = mkstemp()
+        close(handle)  # Only the path is used, save opens it again
+        try:
+            encoder.save(path)
+            assert_equal(lz77.open(path).decode(), "Hello,zHelios_yes")
+        finally:
+            remove(path)
+
+    @raises(ValueError)
+    def test_container_invalid(self):
+        """ Test reading a container with an invalid header """
+        lz77.from_bytes("Hello")
+
+    def test_container_without_window(self):
+        """ Test decoding in chunks instructions packed without an encoder window """
+        decoder = lz77()
+        decoder.instructions = [(0, 0, 'a'), (1, 4, 'b'), (3, 7, 'c')]
+        loaded = lz77.from_bytes(decoder.to_bytes())
+        assert_equal("".join(loaded.decode_stream(chunk_size=2)), "aaaaabaabaabac")
+        assert_equal(loaded.decode(), "aaaaabaabaabac")
+
+    def test_container_truncated_header(self):
+        """ Test reading containers cut short in their header """
+        for data in (LZ77_MAGIC, LZ77_MAGIC + '\x01', LZ77_MAGIC + '\x01\x00\x00', LZ77_MAGIC + '\x01\x80'):
+            try:
+                lz77.from_bytes(data)
+            except ValueError:
+                continue
+            raise AssertionError('No ValueError reading %r' % data)
+
+    @raises(ValueError)
+    def test_container_zero_distance(self):
+        """ Test reading a container with a reference of distance 0 """
+        lz77.from_bytes(LZ77_MAGIC + '\x01\x00\x04' + '\x00' * 4 + '\x03a' + '\x00\x03b')
+
+    @raises(ValueError)
+    def test_container_distance_out_of_range(self):
+        """ Test reading a container with a reference before the start of the output """
+        lz77.from_bytes(LZ77_MAGIC + '\x01\x00\x04' + '\x00' * 4 + '\x03a' + '\x04\x01b')
+
+    def test_container_dictionary(self):
+        """ Test reading a container whose references extend into the dictionary """
+        encoder = lz77()
+        encoder.encode("Hello", 16, dictionary="Hello")
+        decoder = lz77.from_bytes(encoder.to_bytes(), dictionary="Hello")
+        assert_equal(decoder.decode(dictionary="Hello"), "Hello")
+
+    @raises(ValueError)
+    def test_container_checksum(self):
+        """ Test decoding instructions not matching the container checksum """
+        encoder = lz77()
+        encoder.encode("Hello,zHelios_yes", 16)
+        decoder = lz77.from_bytes(encoder.to_bytes())
+        decoder.instructions[0] = (0, 0, 'J')
+        decoder.decode()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+# ----------------------------------------------------------------
+# Description: Testing module for the FM-index. Uses nosetest
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ----------------------------------------------------------------
+
+from dsts.fm_index import FMIndex
+from dsts.misc import get_smp_file, get_test_sample_dir
+from dsts.sa import sort
+from nose.tools import assert_equal, raises
+from os import close, remove
+from os.path import join
+from tempfile import mkstemp
+
+
+def find_all(text, target):
+    """ Returns the positions of every instance of target in text """
+    positions = []
+    pos = text.find(target)
+    while pos != -1:
+        positions.append(pos)
+        pos = text.find(target, pos + 1)
+    return positions
+
+
+class TestFMIndex:
+    """ Testing module for the FM-index """
+    @classmethod
+    def setup_class(self):
+        """ FMINDEX: Initial configuration of TestFMIndex, runs only once """
+        self.text = get_smp_file('hamlet1.txt')
+        self.patterns = ['the', 'be', 'To be, or', 'o', '\n', 'qqq', 'not to be']
+
+    def test_count_and_locate(self):
+        """ FMINDEX: Count and locate substrings """
+        index = FMIndex(self.text)
+        for pattern in self.patterns:
+            assert_equal(index.count(pattern), len(find_all(self.text, pattern)))
+            assert_equal(index.locate(pattern), find_all(self.text, pattern))
+        assert_equal(index.search('qqq'), -1)
+        assert_equal(index.search('To be, or'), 0)
+
+    def test_sampling(self):
+        """ FMINDEX: Results do not depend on the sample rate and checkpoint distance """
+        for sample_rate, checkpoint in ((1, 1), (3, 5), (64, 1024)):
+            index = FMIndex(self.text, sample_rate=sample_rate, checkpoint=checkpoint)
+            for pattern in self.patterns:
+                assert_equal(index.locate(pattern), find_all(self.text, pattern))
+
+    def test_suffix_array(self):
+        """ FMINDEX: Build from a previously sorted suffix array """
+        index = FMIndex('abracadabra', suffix_array=sort('abracadabra'))
+        assert_equal(index.locate('abra'), [0, 7])
+        assert_equal(index.count('a'), 5)
+
+    def test_end_marker_character(self):
+        """ FMINDEX: Strings containing the character standing in for the end marker """
+        text = '\x00ab\x00\x00ba\x00'
+        index = FMIndex(text, sample_rate=2, checkpoint=3)
+        for pattern in ('\x00', '\x00\x00', 'a\x00', 'b'):
+            assert_equal(index.locate(pattern), find_all(text, pattern))
+
+    def test_save_and_open(self):
+        """ FMINDEX: Save an index to a file and memory map it back """
+        handle, path = mkstemp()
+        close(handle)  # Only the path is used, save opens it again
+        try:
+            index = FMIndex(self.text, sample_rate=8, checkpoint=64)
+            index.save(path)
+            loaded = FMIndex.open(path)
+            assert_equal(len(loaded), len(self.text))
+            for pattern in self.patterns:
+                assert_equal(loaded.count(pattern), index.count(pattern))
+                assert_equal(loaded.locate(pattern), index.locate(pattern))
+        finally:
+            remove(path)
+
+    @raises(ValueError)
+    def test_open_invalid_file(self):
+        """ FMINDEX: Raise exception when opening a file that is not an FM-index """
+        FMIndex.open(join(get_test_sample_dir(), 'hamlet1.txt'))
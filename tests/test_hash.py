@@ -7,7 +7,11 @@
 # Licence: BSD Licence, see attached LICENCE file
 # ----------------------------------------------------------------
 
-from dsts.hash import RK_hash_generator
+import dsts.hash
+from dsts.hash import RK_hash_generator, RK_pattern_search, CD_chunker
+from dsts.misc import get_smp_file
+from hashlib import sha1
+from StringIO import StringIO
 from nose.tools import assert_equal, raises
 
 BUFFERSIZE = 16     # Size of buffer to be read by hash generator
@@ -114,6 +118,14 @@ class TestKRFingerprinting:
         hash2 = self.hgen.incremental('8')
         assert_equal(hash1, hash2)
 
+    def test_bytes_like_input(self):
+        """ Hash bytearrays and byte values like strings """
+        gen = RK_hash_generator(BUFFERSIZE, HASHRANGE)
+        assert_equal(gen.hash_block(bytearray('1234567890123456')), gen.hash_block('1234567890123456'))
+        gen.hash_block_with_history(bytearray('1234567890123456'))
+        assert_equal(gen.incremental(ord('7')), self.hgen.hash_block('2345678901234567'))
+        assert_equal(gen.incremental('8'), self.hgen.hash_block('3456789012345678'))
+
     @raises(TypeError)
     def test_increment_using_large_buffer(self):
         """ Incorrectly use a large buffer with increment method """
@@ -130,3 +142,138 @@ class TestKRFingerprinting:
         hash2 = self.hgen.incremental('a')
         assert_equal(hash1, hash1)
         assert_equal(hash2, hash2)
+
+    def test_hash_all(self):
+        """ Compare hash_all against hashing every block """
+        text = '1234567890123456789012345678901234567890abcdefghijklmnopqrstuvwxyz' * 3
+        expected = [self.hgen.hash_block(text[i:i + BUFFERSIZE]) for i in range(len(text) - BUFFERSIZE + 1)]
+        assert_equal(list(self.hgen.hash_all(text)), expected)
+        assert_equal(list(self.hgen.hash_all(bytearray(text))), expected)
+
+    def test_hash_all_short_buffer(self):
+        """ hash_all returns no hashes for a buffer shorter than a block """
+        assert_equal(list(self.hgen.hash_all('123')), [])
+        assert_equal(list(self.hgen.hash_all('')), [])
+
+    def test_hash_all_python(self):
+        """ hash_all gives the same hashes with and without the rk extension """
+        text = get_smp_file('hamlet1.txt')[:2000]
+        expected = list(self.hgen.hash_all(text))
+        extension = dsts.hash.rk
+        dsts.hash.rk = None
+        try:
+            assert_equal(list(self.hgen.hash_all(text)), expected)
+        finally:
+            dsts.hash.rk = extension
+
+    def test_incremental_bounded(self):
+        """ Hashes kept by incremental stay within the hash range """
+        gen = RK_hash_generator(BUFFERSIZE, HASHRANGE)
+        gen.hash_block_with_history('1234567890123456')
+        for char in 'abcdefghijklmnopqrstuvwxyz' * 10:
+            gen.incremental(char)
+            assert 0 <= gen.prev_hash < HASHRANGE
+
+
+class TestRKPatternSearch:
+    """ Testing module for multi pattern Rabin & Karp search """
+    @classmethod
+    def setup_class(self):
+        """ Initial configuration of TestRKPatternSearch, used by all methods """
+        self.text = get_smp_file('hamlet2.txt')
+        self.patterns = ['Hamlet', 'the ', 'Ophelia', 'to be', 'zzzzqq', 'nobleman']
+        self.expected = []
+        for pattern_id, pattern in enumerate(self.patterns):
+            pos = self.text.find(pattern)
+            while pos != -1:
+                self.expected.append((pos, pattern_id))
+                pos = self.text.find(pattern, pos + 1)
+        self.expected.sort()
+
+    def get_search(self, hash_range=None):
+        """ Returns a search with all test patterns registered """
+        search = RK_pattern_search(hash_range) if hash_range else RK_pattern_search()
+        for pattern in self.patterns:
+            search.add(pattern)
+        return search
+
+    def test_search(self):
+        """ Search a string for all patterns """
+        assert_equal(list(self.get_search().search(self.text)), self.expected)
+
+    def test_search_stream(self):
+        """ Matches spanning reads of a file object or buffers of an iterable are found """
+        search = self.get_search()
+        assert_equal(list(search.search(StringIO(self.text), read_size=100)), self.expected)
+        pieces = (bytearray(self.text[i:i + 7]) for i in range(0, len(self.text), 7))
+        assert_equal(list(search.search(pieces)), self.expected)
+
+    def test_search_collisions(self):
+        """ Hash collisions are verified and not reported """
+        assert_equal(list(self.get_search(7).search(self.text)), self.expected)
+
+    def test_pattern_ids(self):
+        """ Matches are reported with the given pattern ids """
+        search = RK_pattern_search()
+        assert_equal(search.add('ab', 'first'), 'first')
+        assert_equal(search.add('bc'), 1)
+        assert_equal(list(search.search('abcab')), [(0, 'first'), (1, 1), (3, 'first')])
+
+    @raises(ValueError)
+    def test_empty_pattern(self):
+        """ Empty patterns cannot be registered """
+        RK_pattern_search().add('')
+
+
+class TestCDChunker:
+    """ Testing module for the content defined chunker """
+    @classmethod
+    def setup_class(self):
+        """ Initial configuration of TestCDChunker, used by all methods """
+        self.chunker = CD_chunker(256, 1024, 4096)
+        self.text = get_smp_file('hamlet2.txt')
+
+    def test_chunks_cover_stream(self):
+        """ Chunks are contiguous, within the size limits and hashed with sha1 """
+        pos = 0
+        for offset, length, digest in self.chunker.chunks(self.text):
+            assert_equal(offset, pos)
+            assert length <= 4096
+            assert length >= 256 or offset + length == len(self.text)
+            assert_equal(digest, sha1(self.text[offset:offset + length]).hexdigest())
+            pos += length
+        assert_equal(pos, len(self.text))
+
+    def test_chunks_independent_of_reads(self):
+        """ Boundaries do not depend on how the stream is read """
+        expected = list(self.chunker.chunks(self.text))
+        chunker = CD_chunker(256, 1024, 4096, read_size=1000)
+        assert_equal(list(chunker.chunks(StringIO(self.text))), expected)
+        pieces = [self.text[i:i + 333] for i in range(0, len(self.text), 333)]
+        assert_equal(list(self.chunker.chunks(pieces)), expected)
+
+    def test_chunks_python(self):
+        """ Boundaries are the same with and without the rk extension """
+        expected = list(self.chunker.chunks(self.text))
+        extension = dsts.hash.rk
+        dsts.hash.rk = None
+        try:
+            assert_equal(list(self.chunker.chunks(self.text)), expected)
+        finally:
+            dsts.hash.rk = extension
+
+    def test_insertion_moves_nearby_boundaries(self):
+        """ An insertion only changes the chunks around it """
+        before = set(digest for offset, length, digest in self.chunker.chunks(self.text))
+        text = self.text[:20000] + 'To be inserted' + self.text[20000:]
+        after = set(digest for offset, length, digest in self.chunker.chunks(text))
+        assert len(before - after) <= 2
+
+    def test_empty_stream(self):
+        """ An empty stream has no chunks """
+        assert_equal(list(self.chunker.chunks('')), [])
+
+    @raises(ValueError)
+    def test_invalid_sizes(self):
+        """ Minimum size larger than the average """
+        CD_chunker(2048, 1024, 4096)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+# ----------------------------------------------------------------
+# Description: Testing module for the instrumentation. Uses nosetest
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ----------------------------------------------------------------
+
+import json
+from threading import Thread
+from dsts import instrument
+from dsts.compression import lz77
+from dsts.instrument import Metrics, active, collect, timer
+from dsts.lz_buffers import factorise_buffer
+from dsts.suffix_array import SuffixArray
+from nose.tools import assert_equal
+
+
+class TestInstrument:
+    """ Testing module for the instrumentation """
+    def test_off(self):
+        """ INSTRUMENT: Nothing is collected outside collect blocks """
+        if instrument.process_metrics is not None:
+            return  # Switched on for the whole process by the environment
+        assert_equal(active(), None)
+        assert timer('unused') is instrument.NULL_TIMER
+        SuffixArray('banana')
+
+    def test_metrics(self):
+        """ INSTRUMENT: Timers, counters and peaks """
+        metrics = Metrics()
+        with metrics.timer('phase'):
+            pass
+        metrics.add('count')
+        metrics.add('count', 2)
+        metrics.peak('size', 3)
+        metrics.peak('size', 1)
+        metrics.peak('negative', -5)
+        result = metrics.as_dict()
+        assert_equal(result['counters'], {'count': 3})
+        assert_equal(result['peaks'], {'size': 3, 'negative': -5})
+        assert result['timers']['phase'] >= 0
+        assert_equal(json.loads(metrics.to_json()), result)
+        metrics.reset()
+        assert_equal(metrics.as_dict(), {'timers': {}, 'counters': {}, 'peaks': {}})
+
+    def test_collect(self):
+        """ INSTRUMENT: Collect the metrics of a block, innermost block first """
+        outer = Metrics()
+        with collect(outer) as metrics:
+            assert metrics is outer
+            with collect() as inner:
+                assert active() is inner
+                inner.add('inner')
+            assert active() is outer
+        assert_equal(outer.counters, {})
+        assert_equal(inner.counters, {'inner': 1})
+
+    def test_collect_thread(self):
+        """ INSTRUMENT: Collect blocks only apply to their own thread """
+        seen = []
+        with collect():
+            thread = Thread(target=lambda: seen.append(active()))
+            thread.start()
+            thread.join()
+        assert_equal(seen, [instrument.process_metrics])
+
+    def test_suffix_array(self):
+        """ INSTRUMENT: Suffix array construction phases """
+        with collect() as metrics:
+            SuffixArray('banana')
+        assert_equal(sorted(metrics.timers), ['suffix_array.lcp', 'suffix_array.sort'])
+        assert_equal(metrics.counters, {'suffix_array.bytes': 6, 'suffix_array.lcp.comparisons': 5})
+        assert_equal(metrics.peaks['suffix_array.rows'], 6)
+
+    def test_lz77(self):
+        """ INSTRUMENT: lz77 encoding and decoding """
+        encoder = lz77()
+        with collect() as metrics:
+            encoder.encode('abcabcabcx', 10)
+            encoder.decode()
+        assert_equal(encoder.instructions, [(0, 0, 'a'), (0, 0, 'b'), (0, 0, 'c'), (3, 4, 'b'), (3, 1, 'x')])
+        assert_equal(sorted(metrics.timers), ['lz77.decode', 'lz77.encode.chains', 'lz77.encode.search'])
+        assert_equal(metrics.counters['lz77.encode.bytes'], 10)
+        assert_equal(metrics.counters['lz77.encode.matches'], 2)
+        assert_equal(metrics.counters['lz77.encode.bytes_matched'], 5)
+        assert_equal(metrics.counters['lz77.decode.bytes_copied'], 5)
+        assert metrics.counters['lz77.encode.probes'] >= 1
+
+    def test_factorise(self):
+        """ INSTRUMENT: Calls to the lz extension """
+        with collect() as metrics:
+            offsets, lengths = factorise_buffer('abababab')
+        assert_equal(metrics.counters, {'lz.factorise.bytes': 8, 'lz.factorise.factors': len(offsets)})
+        assert 'lz.factorise' in metrics.timers
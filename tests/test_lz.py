@@ -9,6 +9,8 @@
 # ----------------------------------------------------------------
 
 from dsts.lz import factorise, refs
+from dsts.lz_buffers import factorise_buffer, factorise_file, refs_buffer, iter_factors
+from dsts.misc import get_smp_file, get_test_sample_dir
 from nose.tools import assert_equal, raises
 from os.path import dirname, realpath
 
@@ -60,3 +62,22 @@ class Test_Factorise:
     def test_lz_refs_empty_string(self):
         """ LZ FACTORISATION: Get reference factors from empty string """
         factors = refs("")
+
+    def test_lz_factorise_buffer(self):
+        """ LZ FACTORISATION: Factorise a buffer into factor arrays """
+        offsets, lengths = factorise_buffer(bytearray('AZZBZZC'))
+        assert_equal(list(offsets), [ord('A'), ord('Z'), 1, ord('B'), 1, ord('C')])
+        assert_equal(list(lengths), [0, 0, 1, 0, 2, 0])
+        assert_equal(tuple(iter_factors(offsets, lengths)), factorise('AZZBZZC'))
+        offsets, lengths = refs_buffer(buffer('ABCAB2B2'))
+        assert_equal(tuple(iter_factors(offsets, lengths)), refs('ABCAB2B2'))
+
+    def test_lz_factorise_file(self):
+        """ LZ FACTORISATION: Factorise a file through a memory map """
+        offsets, lengths = factorise_file(get_test_sample_dir('hamlet1.txt'))
+        assert_equal(tuple(iter_factors(offsets, lengths)), factorise(get_smp_file('hamlet1.txt')))
+
+    @raises(TypeError)
+    def test_lz_factorise_empty_buffer(self):
+        """ LZ FACTORISATION: Raise exception when factorising an empty buffer """
+        factorise_buffer(bytearray())
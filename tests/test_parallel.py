@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+# ----------------------------------------------------------------
+# Description: Testing module for block parallel compression and
+#              factorisation. Uses nosetest
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ----------------------------------------------------------------
+
+from dsts.parallel import compress_blocks, decompress_blocks, decompress_block, factorise_blocks, build_many, \
+    factorise_many
+from dsts.lz import factorise
+from dsts.misc import get_smp_file
+from nose.tools import assert_equal, raises
+
+
+class TestBlocks:
+    """ Testing module for block parallel compression """
+    @classmethod
+    def setup_class(self):
+        """ BLOCKS: Initial configuration of TestBlocks, runs only once """
+        self.var = get_smp_file('hamlet2.txt')
+
+    def test_compress_and_decompress(self):
+        """ BLOCKS: Compress and decompress blocks in parallel """
+        data = compress_blocks(self.var, block_size=8192, window_size=4096, processes=2)
+        assert len(data) < len(self.var)
+        assert_equal(decompress_blocks(data, processes=2), self.var)
+
+    def test_decompress_single_block(self):
+        """ BLOCKS: Decompress one block on its own """
+        data = compress_blocks(self.var, block_size=8192, window_size=4096, processes=1)
+        assert_equal(decompress_block(data, 2), self.var[16384:24576])
+
+    def test_primed_blocks(self):
+        """ BLOCKS: Compress blocks using the end of the previous block as a dictionary """
+        data = compress_blocks(self.var, block_size=8192, window_size=4096, prime=True, processes=2)
+        assert len(data) < len(compress_blocks(self.var, block_size=8192, window_size=4096, processes=2))
+        assert_equal(decompress_blocks(data), self.var)
+        assert_equal(decompress_block(data, 2, self.var[:16384]), self.var[16384:24576])
+
+    @raises(ValueError)
+    def test_primed_block_without_dictionary(self):
+        """ BLOCKS: Raise exception when decompressing a primed block without its dictionary """
+        data = compress_blocks(self.var, block_size=8192, window_size=4096, prime=True, processes=1)
+        decompress_block(data, 2)
+
+    def test_factorise_blocks(self):
+        """ BLOCKS: LZ factorise blocks in parallel """
+        var = 'ABCABCABCABCDZZBZZC'
+        assert_equal(factorise_blocks(var, block_size=12, processes=2),
+                     [(0, factorise(var[:12])), (12, factorise(var[12:]))])
+
+
+class TestThreads:
+    """ Testing module for the thread pool helpers """
+
+    def test_build_many(self):
+        """ THREADS: Build suffix arrays from a thread pool """
+        strings = ['abracadabra', 'banana', get_smp_file('hamlet1.txt')]
+        sarrays = build_many(strings, threads=2)
+        assert_equal([sarray.return_original_str() for sarray in sarrays], strings)
+        assert_equal(sarrays[1].get_lcp_array(), [-1, 1, 3, 0, 0, 2])
+
+    def test_factorise_many(self):
+        """ THREADS: LZ factorise strings from a thread pool """
+        strings = ['ABCAB', 'AZZBZZC']
+        assert_equal(factorise_many(strings, threads=2), [factorise(string) for string in strings])
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+# ----------------------------------------------------------------
+# Description: Testing module for repeat search. Uses nosetest
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ----------------------------------------------------------------
+
+from dsts.search import maximal_repeats, super_maximal_repeats, super_maximal_repeats_left, super_maximal_repeats_right
+from dsts.suffix_array import SuffixArray
+from nose.tools import assert_equal
+
+
+def repeats(sarray, generator):
+    """ Returns the set of (substring, positions) reported by a repeat generator """
+    found = set()
+    for length, lo, hi in generator:
+        position = sarray.suffix_array[lo]
+        found.add((sarray.str[position:position + length], tuple(sorted(sarray.suffix_array[lo:hi]))))
+    return found
+
+
+class TestRepeats:
+    """ Testing module for maximal and super maximal repeats """
+    @classmethod
+    def setup_class(self):
+        """ REPEATS: Initial configuration of TestRepeats, runs only once """
+        self.sarray = SuffixArray('xabcyabczabcqabx')
+
+    def test_maximal_repeats(self):
+        """ REPEATS: Find maximal repeats """
+        assert_equal(repeats(self.sarray, maximal_repeats(self.sarray)),
+                     set([('abc', (1, 5, 9)), ('ab', (1, 5, 9, 13)), ('x', (0, 15))]))
+
+    def test_super_maximal_repeats(self):
+        """ REPEATS: Find super maximal repeats """
+        assert_equal(repeats(self.sarray, super_maximal_repeats(self.sarray)),
+                     set([('abc', (1, 5, 9)), ('x', (0, 15))]))
+        sarray = SuffixArray('xabcyabcz')
+        assert_equal(repeats(sarray, super_maximal_repeats(sarray)), set([('abc', (1, 5))]))
+
+    def test_super_maximal_repeats_left_right(self):
+        """ REPEATS: Find left and right super maximal repeats """
+        assert_equal(repeats(self.sarray, super_maximal_repeats_left(self.sarray)),
+                     set([('abc', (1, 5, 9)), ('ab', (1, 5, 9, 13)), ('x', (0, 15))]))
+        assert_equal(repeats(self.sarray, super_maximal_repeats_right(self.sarray)),
+                     set([('abc', (1, 5, 9)), ('x', (0, 15))]))
+
+    def test_filters(self):
+        """ REPEATS: Filter repeats by length and number of occurrences """
+        assert_equal(repeats(self.sarray, maximal_repeats(self.sarray, min_length=3)), set([('abc', (1, 5, 9))]))
+        assert_equal(repeats(self.sarray, maximal_repeats(self.sarray, min_occurrences=4)),
+                     set([('ab', (1, 5, 9, 13))]))
+
+    def test_string_input(self):
+        """ REPEATS: Find repeats in a string without building the suffix array first """
+        assert_equal(list(super_maximal_repeats('abcdabce')), [(3, 0, 2)])
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+# ----------------------------------------------------------------
+# Description: Testing module for substring statistics. Uses nosetest
+# Author: Angelos Molfetas (2013)
+# Copyright: University of Melbourne (2013)
+# Licence: BSD Licence, see attached LICENCE file
+# ----------------------------------------------------------------
+
+from dsts.stats import substring_classes, top_k_frequent, top_k_gain, ngrams, ngram_histogram
+from dsts.suffix_array import SuffixArray
+from nose.tools import assert_equal, raises
+
+
+def substrings(sarray, items):
+    """ Returns the set of (substring, number of occurrences) for (length, lo, hi) tuples """
+    return set((sarray.get_sarray_prefix(lo, length), hi - lo) for length, lo, hi in items)
+
+
+class TestStats:
+    """ Testing module for substring statistics """
+    @classmethod
+    def setup_class(self):
+        """ STATS: Initial configuration of TestStats, runs only once """
+        self.sarray = SuffixArray('xabcyabczabcqabx')
+
+    def test_substring_classes(self):
+        """ STATS: Count every repeated substring """
+        counts = {}
+        for shortest, longest, lo, hi in substring_classes(self.sarray):
+            for length in range(shortest, longest + 1):
+                counts[self.sarray.get_sarray_prefix(lo, length)] = hi - lo
+        assert_equal(counts, {'a': 4, 'ab': 4, 'abc': 3, 'b': 4, 'bc': 3, 'c': 3, 'x': 2})
+
+    def test_substring_classes_filters(self):
+        """ STATS: Filter substring classes by length and number of occurrences """
+        assert_equal(sorted((shortest, longest, self.sarray.get_sarray_prefix(lo, longest), hi - lo)
+                            for shortest, longest, lo, hi in substring_classes(self.sarray, min_length=2)),
+                     [(2, 2, 'ab', 4), (2, 2, 'bc', 3), (3, 3, 'abc', 3)])
+        assert_equal(len(list(substring_classes(self.sarray, min_occurrences=4))), 2)
+
+    def test_top_k(self):
+        """ STATS: Most frequent substrings and substrings with the largest length times frequency """
+        top = top_k_frequent(self.sarray, 2)
+        assert_equal([(self.sarray.get_sarray_prefix(lo, length), hi - lo) for length, lo, hi in top],
+                     [('ab', 4), ('b', 4)])
+        top = top_k_gain(self.sarray, 2)
+        assert_equal([(self.sarray.get_sarray_prefix(lo, length), hi - lo) for length, lo, hi in top],
+                     [('abc', 3), ('ab', 4)])
+        assert_equal(substrings(self.sarray, top_k_frequent(self.sarray, 10, min_length=3)), set([('abc', 3)]))
+
+    def test_ngrams(self):
+        """ STATS: Count n-grams for a range of n """
+        sarray = SuffixArray('abracadabra')
+        found = set((n, sarray.get_sarray_prefix(lo, n), hi - lo) for n, lo, hi in ngrams(sarray, 2, 3))
+        text = 'abracadabra'
+        expected = set((n, text[i:i + n], text.count(text[i:i + n])) for n in (2, 3) for i in range(len(text) - n + 1))
+        assert_equal(found, expected)
+
+    def test_ngram_histogram(self):
+        """ STATS: Frequency of n-gram frequencies """
+        assert_equal(ngram_histogram('abracadabra', 1, 3), {1: {1: 2, 2: 2, 5: 1}, 2: {1: 4, 2: 3}, 3: {1: 5, 2: 2}})
+
+    @raises(ValueError)
+    def test_invalid_ngram_range(self):
+        """ STATS: Raise exception when the n-gram range is empty """
+        list(ngrams(self.sarray, 3, 2))
@@ -7,13 +7,16 @@
 # Licence: BSD Licence, see attached LICENCE file
 # ----------------------------------------------------------------
 
-from dsts.misc import get_smp_file
-from dsts.suffix_array import SuffixArray
+from dsts.misc import get_smp_file, get_test_sample_dir
+from dsts.storage import MappedArray, write_array
+from dsts.suffix_array import SuffixArray, IncrementalSuffixArray, GeneralisedSuffixArray, ReverseSuffixArray
+from dsts.suffix_array import SA_FILE_HEADER, SA_FILE_MAGIC
 from nose.tools import assert_equal, raises
-from os import remove, makedirs
-from os.path import exists, dirname, realpath, exists
+from os import close, remove, makedirs
+from os.path import exists, dirname, realpath, exists, join
 from sets import Set
 from pprint import pprint
+from tempfile import mkstemp
 
 
 class TestSuffixArray:
@@ -105,3 +108,221 @@ class TestSuffixArray:
         lcp_array = [-1, 1, 0, 0, 0, 4, 0, 3, 0, 2]
         sarray = SuffixArray(string=string)
         assert_equal(lcp_array, sarray.get_lcp_array())
+
+    def test_lcp_array_sample(self):
+        """ SARRAY: Check linear time LCP array against pairwise suffix comparison """
+        sarray = SuffixArray(string=get_smp_file('hamlet1.txt'))
+        expected = [-1, ]
+        for i in range(len(sarray.suffix_array) - 1):
+            expected.append(sarray.compare_strings(sarray.get_sarray_item(i), sarray.get_sarray_item(i + 1)))
+        assert_equal(expected, sarray.get_lcp_array())
+
+    def test_sarray_prefix(self):
+        """ SARRAY: Get bounded prefixes of suffix array rows """
+        sa = SuffixArray("abcadab")
+        for i in range(len(sa.suffix_array)):
+            assert_equal(sa.get_sarray_prefix(i, 2), sa.get_sarray_item(i)[0:2])
+            assert_equal(sa.get_sarray_item_len(i), len(sa.get_sarray_item(i)))
+
+    def test_find_sa_pos(self):
+        """ SARRAY: Find sorted position of a string within the suffix array """
+        sa = SuffixArray("abcadab")  # ['ab', 'abcadab', 'adab', 'b', 'bcadab', 'cadab', 'dab']
+        assert_equal(sa.find_SA_pos('abcadab'), 1)
+        assert_equal(sa.find_SA_pos('ac'), 2)
+        assert_equal(sa.find_SA_pos('bb'), 4)
+
+    def test_search_range(self):
+        """ SARRAY: Search for the suffix array interval of a substring """
+        sa = SuffixArray(string='z123ABC123CBA256123')
+        lo, hi = sa.search_range('123')
+        assert_equal(sorted(sa.suffix_array[lo:hi]), [1, 7, 16])
+        lo, hi = sa.search_range('x')
+        assert_equal(lo, hi)
+        assert_equal(sa.search_range(''), (0, len(sa.suffix_array)))
+
+    def test_count(self):
+        """ SARRAY: Count instances of a substring """
+        sa = SuffixArray(string='abracadabra')
+        assert_equal(sa.count('abra'), 2)
+        assert_equal(sa.count('a'), 5)
+        assert_equal(sa.count('abracadabra'), 1)
+        assert_equal(sa.count('abracadabraa'), 0)
+        assert_equal(sa.count('e'), 0)
+
+    def test_search_many(self):
+        """ SARRAY: Search for several substrings at once """
+        sa = SuffixArray(string='z123ABC123CBA256123')
+        results = sa.search_many(['123', 'x', 'z', '12', '123'])
+        assert_equal([sorted(r) for r in results], [[1, 7, 16], [], [0], [1, 7, 16], [1, 7, 16]])
+        assert_equal(list(sa.count_many(['123', 'x', 'z', '12', '1234'])), [3, 0, 1, 3, 0])
+
+    def test_save_and_open(self):
+        """ SARRAY: Save a suffix array to a file and memory map it back """
+        handle, path = mkstemp()
+        close(handle)  # Only the path is used, save opens it again
+        try:
+            sa = SuffixArray(string='z123ABC123CBA256123')
+            sa.save(path)
+            loaded = SuffixArray.open(path)
+            assert_equal(loaded.return_original_str()[:], sa.return_original_str())
+            assert_equal(list(loaded.suffix_array), list(sa.suffix_array))
+            assert_equal(loaded.get_lcp_array(), sa.get_lcp_array())
+            assert_equal(loaded.search_all('123'), sa.search_all('123'))
+            assert_equal(loaded.count('12'), 3)
+            assert_equal([list(items) for items in loaded.lcp_lr], [list(items) for items in sa.lcp_lr])
+            assert isinstance(loaded.lcp_lr[0], MappedArray)  # Read from the file rather than rebuilt
+        finally:
+            remove(path)
+
+    def test_open_version_1(self):
+        """ SARRAY: Open a file saved without LCP-LR arrays """
+        sa = SuffixArray(string='z123ABC123CBA256123')
+        handle, path = mkstemp()
+        close(handle)  # Only the path is used
+        try:
+            with open(path, 'wb') as f:
+                f.write(SA_FILE_HEADER.pack(SA_FILE_MAGIC, 1, 4, len(sa.str)))
+                f.write(sa.str)
+                write_array(f, sa.suffix_array, '<I')
+                write_array(f, sa.lcp_array, '<i')
+            loaded = SuffixArray.open(path)
+            assert_equal(loaded.lcp_lr, None)
+            assert_equal(sorted(loaded.search_all('123')), [1, 7, 16])
+        finally:
+            remove(path)
+
+    @raises(ValueError)
+    def test_open_invalid_file(self):
+        """ SARRAY: Raise exception when opening a file that is not a suffix array """
+        SuffixArray.open(join(get_test_sample_dir(), 'hamlet1.txt'))
+
+    def test_compact(self):
+        """ SARRAY: Store the suffix array as an array of integers """
+        sa = SuffixArray(string='z123ABC123CBA256123')
+        compact = SuffixArray(string='z123ABC123CBA256123', compact=True)
+        assert_equal(compact.suffix_array.typecode, 'I')
+        assert_equal(list(compact.suffix_array), list(sa.suffix_array))
+        assert_equal(compact.get_lcp_array(), sa.get_lcp_array())
+        assert_equal(compact.search_all('123'), sa.search_all('123'))
+        assert_equal(compact.get_pos(3), sa.get_pos(3))
+
+    def test_bytes_like_input(self):
+        """ SARRAY: Build from a bytearray, memoryview and memory mapped file """
+        from mmap import mmap, ACCESS_READ
+        from tempfile import TemporaryFile
+        sa = SuffixArray(string='z123ABC123CBA256123')
+        f = TemporaryFile()
+        try:
+            f.write('z123ABC123CBA256123')
+            f.flush()
+            mapped = mmap(f.fileno(), 0, access=ACCESS_READ)
+            for data in (bytearray('z123ABC123CBA256123'), memoryview('z123ABC123CBA256123'), mapped):
+                other = SuffixArray(string=data)
+                assert_equal(list(other.suffix_array), list(sa.suffix_array))
+                assert_equal(other.get_lcp_array(), sa.get_lcp_array())
+                assert_equal(other.search_all('123'), sa.search_all('123'))
+                assert_equal(other.get_sarray_item(2), sa.get_sarray_item(2))
+        finally:
+            f.close()
+
+
+class TestIncrementalSuffixArray:
+    """ Testing module for the appendable Suffix Array """
+
+    def test_append(self):
+        """ ISARRAY: Append chunks and search across them """
+        sarray = IncrementalSuffixArray('z123AB')
+        sarray.append('C123CB')
+        sarray.append('A25')
+        sarray.append('6123')
+        assert_equal(sarray.return_original_str(), 'z123ABC123CBA256123')
+        assert_equal(sarray.search_all('123'), [1, 7, 16])
+        assert_equal(sarray.search_all('BA2'), [11])  # Crosses a segment boundary
+        assert_equal(sarray.search_all('x'), [])
+        assert_equal(sarray.search('3'), 3)
+        assert_equal(sarray.count('A'), 2)
+
+    def test_merge_segments(self):
+        """ ISARRAY: Segments are merged as they grow """
+        sarray = IncrementalSuffixArray()
+        for i in range(16):
+            sarray.append('ab')
+        assert_equal(len(sarray.segments), 1)
+        assert_equal(sarray.count('ba'), 15)
+
+
+class TestReverseSuffixArray:
+    """ Testing module for the Suffix Array of the reversed string """
+    @classmethod
+    def setup_class(self):
+        """ RSARRAY: Initial configuration of TestReverseSuffixArray, runs only once """
+        self.sarray = ReverseSuffixArray('z123ABC123CBA256123')
+
+    def test_search(self):
+        """ RSARRAY: Search for substrings, positions refer to the original string """
+        assert_equal(sorted(self.sarray.search_all('123')), [1, 7, 16])
+        assert_equal(self.sarray.search_all('x'), [])
+        assert_equal(self.sarray.search('BA2'), 11)
+        assert_equal(self.sarray.search('x'), -1)
+        assert_equal(self.sarray.count('3'), 3)
+        assert_equal([sorted(r) for r in self.sarray.search_many(['23', 'C'])], [[2, 8, 17], [6, 10]])
+
+    def test_end_relative_positions(self):
+        """ RSARRAY: Positions relative to the end of the string """
+        assert_equal(self.sarray.search_reverse('256'), 3)
+        assert_equal(self.sarray.search_reverse('z'), 18)
+        assert_equal(sorted(self.sarray.get_end(i) for i in range(*self.sarray.search_range('123'))), [4, 10, 19])
+
+    def test_left_extensions(self):
+        """ RSARRAY: Characters preceding the instances of a substring """
+        assert_equal(self.sarray.left_extensions('123'), [('6', 1), ('C', 1), ('z', 1)])
+        assert_equal(self.sarray.left_extensions('z1'), [])  # Starts the string
+        assert_equal(self.sarray.left_extensions('3'), [('2', 3)])
+
+    def test_original_str(self):
+        """ RSARRAY: Return the string as given """
+        assert_equal(self.sarray.return_original_str(), 'z123ABC123CBA256123')
+
+    def test_save_and_open(self):
+        """ RSARRAY: Save a reverse suffix array and memory map it back """
+        handle, path = mkstemp()
+        close(handle)  # Only the path is used, save opens it again
+        try:
+            self.sarray.save(path)
+            loaded = ReverseSuffixArray.open(path)
+            assert_equal(loaded.return_original_str(), 'z123ABC123CBA256123')
+            assert_equal(sorted(loaded.search_all('123')), [1, 7, 16])
+        finally:
+            remove(path)
+
+
+class TestGeneralisedSuffixArray:
+    """ Testing module for the multi document Suffix Array """
+    @classmethod
+    def setup_class(self):
+        """ GSARRAY: Initial configuration of TestGeneralisedSuffixArray, runs only once """
+        self.sarray = GeneralisedSuffixArray(['abcab', 'cabx', 'ab'])
+
+    def test_documents(self):
+        """ GSARRAY: Map positions to documents """
+        assert_equal(self.sarray.get_doc_count(), 3)
+        assert_equal(self.sarray.get_document(1), 'cabx')
+        assert_equal(self.sarray.get_doc_pos(7), (1, 1))
+
+    def test_search_all(self):
+        """ GSARRAY: Search all documents for a substring """
+        assert_equal(sorted(self.sarray.search_all('ab')), [(0, 0), (0, 3), (1, 1), (2, 0)])
+        assert_equal(self.sarray.search_all('bc'), [(0, 1)])
+        assert_equal(self.sarray.search('x'), (1, 3))
+        assert_equal(self.sarray.search_all('b\x00c'), [])  # Would cross into the next document
+        assert_equal(self.sarray.count('abc'), 1)
+
+    def test_lcp_array(self):
+        """ GSARRAY: LCP array does not extend past document ends """
+        sarray = GeneralisedSuffixArray(['ab', 'ab'])
+        assert_equal(max(sarray.get_lcp_array()), 2)
+
+    @raises(ValueError)
+    def test_invalid_document(self):
+        """ GSARRAY: Raise exception when a document contains the separator """
+        GeneralisedSuffixArray(['ab', 'a\x00b'])